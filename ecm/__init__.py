@@ -1,15 +1,53 @@
 # flake8: noqa
 
-from .cell_discharge_data import CellDischargeData
-from .cell_ecm import CellEcm
-from .cell_hppc_data import CellHppcData
-from .cell_temperature_data import CellTemperatureData
+# Classes and functions are imported on first use so that light-weight modules
+# such as `model_artifact` can be used without importing pandas or scipy.
 
-from .module_ecm import ModuleEcm
-from .module_hppc_data import ModuleHppcData
+from importlib import import_module
 
-from .pack_us06_data import PackUs06Data
+_exports = {
+    'load_campaign': '.campaign',
 
-from .thermal_model import ThermalModel
+    'CellDischargeData': '.cell_discharge_data',
+    'CellEcm': '.cell_ecm',
+    'CellHppcData': '.cell_hppc_data',
+    'CellTemperatureData': '.cell_temperature_data',
 
-from .utils import config_ax
+    'DataBlock': '.data_block',
+
+    'EcmStepper': '.ecm_stepper',
+
+    'iter_sections': '.loaders',
+
+    'ModelArtifact': '.model_artifact',
+    'load_model': '.model_artifact',
+    'save_model': '.model_artifact',
+
+    'ModuleEcm': '.module_ecm',
+    'ModuleHppcData': '.module_hppc_data',
+
+    'PackEcm': '.pack_ecm',
+    'run_ensemble': '.pack_ensemble',
+    'PackTopology': '.pack_topology',
+    'PackUs06Data': '.pack_us06_data',
+
+    'ParamCache': '.param_cache',
+
+    'ThermalModel': '.thermal_model',
+
+    'config_ax': '.utils',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name in _exports:
+        value = getattr(import_module(_exports[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,52 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _load(loader, path, args):
+    """
+    Load one data file and return the data object and the load time.
+    """
+    tic = time.perf_counter()
+    data = loader(path, *args)
+    toc = time.perf_counter()
+    return data, toc - tic
+
+
+def load_campaign(manifest, max_workers=None):
+    """
+    Load the data files of a test campaign at the same time on a thread pool.
+    Most of the load time is spent in the pandas CSV parser which releases the
+    GIL, so the total time is close to the load time of the largest file.
+
+    Parameters
+    ----------
+    manifest : dict
+        Files to load given as `name: (loader, path, *args)` where `loader` is
+        a data class such as `CellHppcData` or a class method such as
+        `CellDischargeData.process`. Other arguments such as `ti` and `tf` for
+        `CellTemperatureData` follow the path.
+    max_workers : int, optional
+        Number of threads used to load the files. Default is `None` for the
+        number of files up to the number of processors plus four.
+
+    Returns
+    -------
+    data : dict
+        Data object for each name in the manifest.
+    timings : dict
+        Load time for each name in the manifest [s]
+    """
+    if max_workers is None:
+        max_workers = min(len(manifest), (os.cpu_count() or 1) + 4) or 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            name: pool.submit(_load, entry[0], entry[1], entry[2:])
+            for name, entry in manifest.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+
+    data = {name: obj for name, (obj, _) in results.items()}
+    timings = {name: sec for name, (_, sec) in results.items()}
+    return data, timings
@@ -1,5 +1,6 @@
 import numpy as np
-import pandas as pd
+
+from .loaders import EMPTY_INDEX, flag_index, read_columns
 
 
 class CellDischargeData:
@@ -7,6 +8,8 @@ class CellDischargeData:
     Battery cell data from discharge test.
     """
 
+    __slots__ = ('block', 'time', 'current', 'voltage', 'data', 'ti', 'tf', '_index', '_idx')
+
     def __init__(self, path):
         """
         Initialize with path to discharge data file.
@@ -28,15 +31,22 @@ class CellDischargeData:
             Data flags from battery test [-]
         dt : vector
             Time step [s]
+        block : DataBlock
+            Data for all the channels where `time`, `current`, `voltage`, and
+            `data` are views of the block.
         """
-        df = pd.read_csv(path)
-        self.time = df['Time(s)'].values
-        self.current = df['Current(A)'].values
-        self.voltage = df['Voltage(V)'].values
-        self.data = df['Data'].fillna(' ').values
+        self.block = read_columns(path, ['Time(s)', 'Current(A)', 'Voltage(V)'], flag='Data')
+        self.time = self.block['Time(s)']
+        self.current = self.block['Current(A)']
+        self.voltage = self.block['Voltage(V)']
+        self.data = self.block['Data']
         self.ti = 0
         self.tf = 0
 
+        # flags are scanned once when loaded and section indices are kept after first use
+        self._index = flag_index(self.block.codes, self.block.categories)
+        self._idx = None
+
     def get_ids(self):
         """
         Find indices in data that represent the `S` flag. Start and stop
@@ -47,7 +57,7 @@ class CellDischargeData:
         ids : vector
             Indices of start and stop points in data.
         """
-        ids = np.where(self.data == 'S')[0]
+        ids = self._index.get('S', EMPTY_INDEX)
         return ids
 
     def get_idx(self):
@@ -63,9 +73,17 @@ class CellDischargeData:
             id2 = start of charge
             id3 = end of charge
         """
-        ids = self.get_ids()
+        if self._idx is None:
+            self._idx = self._find_idx(self.get_ids(), np.abs(self.current).max())
+        return self._idx
 
-        if max(abs(self.current)) > 35:
+    @staticmethod
+    def _find_idx(ids, i_max):
+        """
+        Section indices from the indices of the `S` flag and the maximum
+        absolute current of the test.
+        """
+        if i_max > 35:
             # 2c and 3c discharge tests
             id0 = ids[3]
             id1 = ids[4]
@@ -80,6 +98,17 @@ class CellDischargeData:
 
         return id0, id1, id2, id3
 
+    def _set_window(self, start, stop):
+        """
+        Time, current, and voltage as views of the rows of the data block
+        from `start` up to but not including `stop`. The flags are not
+        changed so the indices from `get_idx()` still refer to the whole test.
+        """
+        self.block = self.block.window(start, stop)
+        self.time = self.block['Time(s)']
+        self.current = self.block['Current(A)']
+        self.voltage = self.block['Voltage(V)']
+
     @classmethod
     def process(cls, path):
         """
@@ -92,9 +121,8 @@ class CellDischargeData:
 
         data.ti = data.time[id0]
         data.tf = data.time[id2]
-        data.current = data.current[id0:id2 + 1]
-        data.voltage = data.voltage[id0:id2 + 1]
-        data.time = data.time[id0:id2 + 1] - data.time[id0:id2 + 1].min()
+        data._set_window(id0, id2 + 1)
+        data.time = data.time - data.time.min()
 
         return data
 
@@ -109,8 +137,7 @@ class CellDischargeData:
 
         data.ti = data.time[id0]
         data.tf = data.time[id1]
-        data.current = data.current[id0:id1 + 1]
-        data.voltage = data.voltage[id0:id1 + 1]
-        data.time = data.time[id0:id1 + 1] - data.time[id0:id1 + 1][0]
+        data._set_window(id0, id1 + 1)
+        data.time = data.time - data.time[0]
 
         return data
@@ -1,5 +1,7 @@
 import numpy as np
-from scipy.optimize import curve_fit
+
+from .fitting import fit_sections, jac_otc, jac_ttc
+from .kernels import linear_recurrence, soc_coulomb, soc_index, vt_cells
 
 
 class CellEcm:
@@ -34,6 +36,8 @@ class CellEcm:
     -------
     soc()
         Determine state of charge from current profile.
+    soc_cells(current, zi, q)
+        Determine state of charge for several cells from a current array.
     points(soc)
         Get open circuit voltage points from HPPC data.
     ocv(v_pts, z_pts, soc)
@@ -44,6 +48,8 @@ class CellEcm:
         Determine RC values for each 10% SOC section.
     vt(soc, ocv, rctau)
         Determine battery voltage from equivalent circuit model.
+    vt_cells(current, soc, ocv, rctau)
+        Determine voltage for several cells from a current array.
     """
 
     def __init__(self, data, params):
@@ -74,22 +80,26 @@ class CellEcm:
         """
         return a - b * np.exp(-alpha * t) - c * np.exp(-beta * t)
 
+    # Jacobians of the exponential functions are defined once in the fitting module
+    jac_otc = staticmethod(jac_otc)
+    jac_ttc = staticmethod(jac_ttc)
+
     @staticmethod
     def get_rtau(rctau, z):
         """
-        Determine tau and resistor values for any SOC.
+        Determine tau and resistor values for any SOC. The SOC can be a single
+        value or a vector of values such as an entire SOC profile.
         """
 
         # determine index where z is close to soc parameters
-        soc = np.arange(0.1, 1.0, 0.1)[::-1]
-        idx = abs(soc - z).argmin()
+        idx = soc_index(z)
 
         # return resistor and tau values at z
-        tau1 = rctau[:, 0][idx]
-        tau2 = rctau[:, 1][idx]
-        r0 = rctau[:, 2][idx]
-        r1 = rctau[:, 3][idx]
-        r2 = rctau[:, 4][idx]
+        tau1 = rctau[idx, 0]
+        tau2 = rctau[idx, 1]
+        r0 = rctau[idx, 2]
+        r1 = rctau[idx, 3]
+        r2 = rctau[idx, 4]
         return tau1, tau2, r0, r1, r2
 
     def soc(self):
@@ -121,23 +131,36 @@ class CellEcm:
         .. [#plett] Plett, Gregory L. Battery Management Systems, Volume I: Battery
            Modeling. Vol. 2. Artech House, 2015.
         """
-        current = self.current
-        time = self.time
+        z = soc_coulomb(self.current, self.time, self.q_cell, self.eta_chg, self.eta_dis)
+        return z
 
-        q = self.q_cell * 3600
-        dt = np.diff(time)
+    def soc_cells(self, current, zi=1.0, q=None):
+        """
+        State of charge (SOC) for several battery cells that share the time
+        vector of the model. All cells are calculated in one vectorized pass
+        instead of setting `current` and calling `soc()` for each cell.
 
-        nc = len(current)
-        z = np.ones(nc)
+        Parameters
+        ----------
+        current : array
+            Current for each cell where rows are cells and columns are time
+            steps, shape is (n_cells, n_steps) [A]
+        zi : float or vector, optional
+            Initial state of charge for each cell [-]. Default value is 1.0.
+        q : float or vector, optional
+            Total capacity of each cell [Ah]. Default is capacity of the
+            battery cell `q_cell` from the model parameters.
 
-        for k in range(1, nc):
-            i = current[k]
-            if i > 0:
-                eta = self.eta_chg
-            else:
-                eta = self.eta_dis
-            z[k] = z[k - 1] + ((eta * i * dt[k - 1]) / q)
+        Returns
+        -------
+        z : array
+            State of charge for each cell at every time step, shape is
+            (n_cells, n_steps) [-]
+        """
+        if q is None:
+            q = self.q_cell
 
+        z = soc_coulomb(current, self.time, q, self.eta_chg, self.eta_dis, zi=zi)
         return z
 
     def ocv(self, soc, pts=False, vz_pts=None):
@@ -188,7 +211,8 @@ class CellEcm:
             ocv = np.interp(soc, z_pts[::-1], v_pts[::-1])
             return ocv
 
-    def curve_fit_coeff(self, func, ncoeff):
+    def curve_fit_coeff(self, func, ncoeff, executor=None, n_jobs=None, jac=None, warm_start=False,
+                        nfev=False, method='curve_fit'):
         """
         Determine curve fit coefficients for each 10% change in SOC from HPPC
         data. These coefficients are used to calculate the RC parameters.
@@ -199,15 +223,43 @@ class CellEcm:
             Exponential function defining the curve.
         ncoeff : int
             Number of coefficients in the exponential function.
+        executor : Executor, optional
+            Thread or process pool from `concurrent.futures` used to fit the
+            SOC sections at the same time. Default is `None`.
+        n_jobs : int, optional
+            Number of processes used to fit the SOC sections when an executor
+            is not given. Use -1 for the number of processors. Default is
+            `None` where the sections are fit one after another.
+        jac : function, optional
+            Jacobian of the exponential function such as `jac_otc` or
+            `jac_ttc`. Default is `None` where the Jacobian is estimated with
+            finite differences.
+        warm_start : bool, optional
+            Seed each SOC section with the converged coefficients of the
+            previous SOC section. Sections are fit one after another. Default
+            value is `False`.
+        nfev : bool, optional
+            Return the number of function evaluations for each SOC section.
+            Default value is `False`.
+        method : str, optional
+            Use 'curve_fit' to fit all coefficients with nonlinear least
+            squares or 'varpro' for a variable projection fit where the linear
+            coefficients of `func_otc` or `func_ttc` are solved in closed form
+            and only the rates are searched. The variable projection fit is
+            more robust to the initial guess but slower. Default value is
+            'curve_fit'.
 
         Returns
         -------
         coeff : array
             Coefficients at each 10% change in SOC.
+        nfev : vector, optional
+            Number of function evaluations for each 10% change in SOC.
         """
         _, _, id2, _, id4 = self.idd
         nrow = len(id2)
         coeff = np.zeros((nrow, ncoeff))
+        sections = []
 
         for i in range(nrow):
             start = id2[i]
@@ -219,9 +271,18 @@ class CellEcm:
                 guess = v_curve[-1], 0.01, 0.01
             elif ncoeff == 5:
                 guess = v_curve[-1], 0.01, 0.01, 0.001, 0.01
-            popt, pcov = curve_fit(func, t_scale, v_curve, p0=guess)
-            coeff[i] = popt
+            sections.append((t_scale, v_curve, guess))
 
+        kwargs = {}
+        if jac is not None:
+            kwargs['jac'] = jac
+
+        popts, nfevs = fit_sections(
+            func, sections, kwargs, executor=executor, n_jobs=n_jobs, warm_start=warm_start, method=method)
+        coeff[:] = popts
+
+        if nfev:
+            return coeff, np.array(nfevs)
         return coeff
 
     def rctau_ttc(self, coeff):
@@ -288,24 +349,49 @@ class CellEcm:
         v1 = np.zeros(nc)           # initialize v1 array
         v2 = np.zeros(nc)           # initialize v2 array
 
-        for k in range(1, nc):
-            i = self.current[k]
-
-            # get parameters at state of charge
-            tau1, tau2, r0, r1, r2 = self.get_rtau(rctau, soc[k])
+        # get parameters at state of charge for all time steps
+        i = self.current[1:]
+        tau1, tau2, r0, r1, r2 = self.get_rtau(rctau, soc[1:])
 
-            # voltage in r0 resistor
-            v0[k] = r0 * i
+        # voltage in r0 resistor
+        v0[1:] = r0 * i
 
-            # voltage in c1 capacitor
-            tm1 = v1[k - 1] * np.exp(-dt[k - 1] / tau1)
-            tm2 = r1 * (1 - np.exp(-dt[k - 1] / tau1)) * i
-            v1[k] = tm1 + tm2
+        # decay and input terms for voltage in c1 and c2 capacitors
+        a1 = np.exp(-dt / tau1)
+        b1 = r1 * (1 - a1) * i
+        a2 = np.exp(-dt / tau2)
+        b2 = r2 * (1 - a2) * i
 
-            # voltage in c2 capacitor
-            tm3 = v2[k - 1] * np.exp(-dt[k - 1] / tau2)
-            tm4 = r2 * (1 - np.exp(-dt[k - 1] / tau2)) * i
-            v2[k] = tm3 + tm4
+        # voltage in c1 and c2 capacitors as first-order linear recurrences
+        v1[1:] = linear_recurrence(a1, b1)
+        v2[1:] = linear_recurrence(a2, b2)
 
         vt = ocv + v0 + v1 + v2
         return vt
+
+    def vt_cells(self, current, soc, ocv, rctau):
+        """
+        Determine voltage from equivalent circuit model for several battery
+        cells that share the time vector of the model. All cells are
+        calculated in one vectorized pass instead of setting `current` and
+        calling `vt()` for each cell.
+
+        Parameters
+        ----------
+        current : array
+            Current for each cell, shape is (n_cells, n_steps) [A]
+        soc : array
+            State of charge for each cell, shape is (n_cells, n_steps) [-]
+        ocv : array
+            Open circuit voltage for each cell, shape is (n_cells, n_steps) [V]
+        rctau : array
+            RC parameters shared by all cells or RC parameters for each cell
+            stacked as shape (n_cells, n_rows, 7).
+
+        Returns
+        -------
+        vt : array
+            Voltage for each cell, shape is (n_cells, n_steps) [V]
+        """
+        vt = vt_cells(current, self.time, soc, ocv, rctau)
+        return vt
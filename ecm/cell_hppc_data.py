@@ -1,5 +1,4 @@
-import numpy as np
-import pandas as pd
+from .loaders import EMPTY_INDEX, flag_index, freeze, read_columns, slice_index
 
 
 class CellHppcData:
@@ -7,6 +6,8 @@ class CellHppcData:
     Data from HPPC battey cell test.
     """
 
+    __slots__ = ('block', 'time', 'current', 'voltage', 'flags', '_index', '_pulse', '_discharge')
+
     def __init__(self, path, all_data=False):
         """
         Initialize with path to HPPC data file.
@@ -30,26 +31,31 @@ class CellHppcData:
             Voltage from HPPC battery cell during test [V]
         flags : vector
             Flags for start and stop events in the HPPC battery cell data [-]
+        block : DataBlock
+            Data for all the channels where `current`, `voltage`, and `flags`
+            are views of the block.
         """
-        df = pd.read_csv(path)
+        block = read_columns(path, ['Time(s)', 'Current(A)', 'Voltage(V)'], flag='Data')
+        index = flag_index(block.codes, block.categories)
 
         if all_data:
-            self.time = df['Time(s)'].values
-            self.current = df['Current(A)'].values
-            self.voltage = df['Voltage(V)'].values
-            self.flags = df['Data'].fillna(' ').values
+            self.time = block['Time(s)']
         else:
-            time = df['Time(s)'].values
-            current = df['Current(A)'].values
-            voltage = df['Voltage(V)'].values
-            flags = df['Data'].fillna(' ').values
-
             # time vector is scaled to begin at 0, this helps when calculating curve fit coefficients
-            ids = np.where(flags == 'S')[0]
-            self.time = time[ids[1]:] - time[ids[1]]
-            self.current = current[ids[1]:]
-            self.voltage = voltage[ids[1]:]
-            self.flags = flags[ids[1]:]
+            start = index['S'][1]
+            block = block.window(start)
+            index = slice_index(index, start)
+            self.time = block['Time(s)'] - block['Time(s)'][0]
+
+        self.block = block
+        self.current = block['Current(A)']
+        self.voltage = block['Voltage(V)']
+        self.flags = block['Data']
+
+        # flags are scanned once when loaded and section indices are kept after first use
+        self._index = index
+        self._pulse = None
+        self._discharge = None
 
     def get_indices_s(self):
         """
@@ -61,7 +67,7 @@ class CellHppcData:
         ids : vector
             Indices of start and stop points in data.
         """
-        ids = np.where(self.flags == 'S')[0]
+        ids = self._index.get('S', EMPTY_INDEX)
         return ids
 
     def get_indices_q(self):
@@ -73,7 +79,7 @@ class CellHppcData:
         idq : int
             Index of final stop point in data.
         """
-        idq = np.where(self.flags == 'Q')[0]
+        idq = self._index.get('Q', EMPTY_INDEX)
         return idq
 
     def get_indices_pulse(self):
@@ -94,13 +100,9 @@ class CellHppcData:
         id4 : ndarray
             Indices at end of pulse discharge rest period for each 10% SOC section.
         """
-        ids = self.get_indices_s()
-        id0 = ids[0::5]
-        id1 = id0 + 1
-        id2 = ids[1::5]
-        id3 = id2 + 1
-        id4 = ids[2::5]
-        return id0, id1, id2, id3, id4
+        if self._pulse is None:
+            self._pulse = self._find_pulse(self.get_indices_s())
+        return self._pulse
 
     def get_indices_discharge(self):
         """
@@ -121,10 +123,30 @@ class CellHppcData:
         id4 : ndarray
             Indices at end of constant discharge rest period for each 10% SOC section.
         """
-        ids = self.get_indices_s()
+        if self._discharge is None:
+            self._discharge = self._find_discharge(self.get_indices_s())
+        return self._discharge
+
+    @staticmethod
+    def _find_pulse(ids):
+        """
+        Pulse section indices from the indices of the `S` flag.
+        """
+        id0 = ids[0::5]
+        id1 = id0 + 1
+        id2 = ids[1::5]
+        id3 = id2 + 1
+        id4 = ids[2::5]
+        return freeze(id0, id1, id2, id3, id4)
+
+    @staticmethod
+    def _find_discharge(ids):
+        """
+        Constant discharge section indices from the indices of the `S` flag.
+        """
         id0 = ids[3::5][:-1]
         id1 = id0 + 1
         id2 = ids[4::5]
         id3 = id2 + 1
         id4 = ids[5::5]
-        return id0, id1, id2, id3, id4
+        return freeze(id0, id1, id2, id3, id4)
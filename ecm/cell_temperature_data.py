@@ -1,5 +1,24 @@
 import numpy as np
-import pandas as pd
+
+from .data_block import DataBlock
+from .loaders import cached, nearest_index, read_lvm
+
+
+def _read_stats(path):
+    """
+    Max, average, and min of thermocouples one to three for each row. The
+    statistics are cached with the parsed file so they are only calculated
+    once for each file.
+    """
+    def reader():
+        tcs = read_lvm(path, [1, 2, 3, 4])[:, :3]
+        stats = np.empty((len(tcs), 3))
+        np.max(tcs, axis=1, out=stats[:, 0])
+        np.mean(tcs, axis=1, out=stats[:, 1])
+        np.min(tcs, axis=1, out=stats[:, 2])
+        return {'stats': stats}
+
+    return cached(path, ('read_lvm_stats', (1, 2, 3)), reader)['stats']
 
 
 class CellTemperatureData:
@@ -7,6 +26,8 @@ class CellTemperatureData:
     Battery cell temperature data from charge/discharge test.
     """
 
+    __slots__ = ('block', 'stats', 'time', 'tc1', 'tc2', 'tc3', 'tc4', 'tmax', 'tavg', 'tmin', 'id0', 'id1')
+
     def __init__(self, path, ti, tf):
         """
         Initialize with path to temperature data file.
@@ -26,22 +47,39 @@ class CellTemperatureData:
             Thermocouple one [°C]
         tc4 : vector
             Thermocouple one [°C]
+        block : DataBlock
+            Thermocouple data where `tc1` to `tc4` are views of the block [°C]
+        stats : DataBlock
+            Max, average, and min of thermocouples one to three where `tmax`,
+            `tavg`, and `tmin` are views of the block [°C]
+
+        Note
+        ----
+        Both blocks are read-only views of the arrays cached for the file, so
+        creating the data again for the same file does not copy the data.
         """
-        df = pd.read_csv(path, header=None, sep='\t', usecols=[1, 2, 3, 4])
-        self.tc1 = df[1]
-        self.tc2 = df[2]
-        self.tc3 = df[3]
-        self.tc4 = df[4]
-        self.tmax = np.max((df[1], df[2], df[3]), axis=0)
-        self.tavg = np.mean((df[1], df[2], df[3]), axis=0)
-        self.tmin = np.min((df[1], df[2], df[3]), axis=0)
+        self.block = DataBlock(read_lvm(path, [1, 2, 3, 4]), ('tc1', 'tc2', 'tc3', 'tc4'))
+        self.stats = DataBlock(_read_stats(path), ('tmax', 'tavg', 'tmin'))
+        self._set_views()
 
         # time for temperature data acquisition, time recorded every 3 seconds
-        self.time = np.arange(len(self.tc1)) * 3
+        self.time = np.arange(len(self.block)) * 3
 
         # indices for start and end of section from original data
-        self.id0 = np.argmin(np.abs(ti - self.time))
-        self.id1 = np.argmin(np.abs(tf - self.time))
+        self.id0 = nearest_index(self.time, ti)
+        self.id1 = nearest_index(self.time, tf)
+
+    def _set_views(self):
+        """
+        Thermocouple and statistics attributes as views of the data blocks.
+        """
+        self.tc1 = self.block['tc1']
+        self.tc2 = self.block['tc2']
+        self.tc3 = self.block['tc3']
+        self.tc4 = self.block['tc4']
+        self.tmax = self.stats['tmax']
+        self.tavg = self.stats['tavg']
+        self.tmin = self.stats['tmin']
 
     @classmethod
     def process(cls, path, ti, tf):
@@ -56,23 +94,14 @@ class CellTemperatureData:
         # use data from first section of original data, time is adjusted to
         # start at zero, if id0 = id1 then data is from 3C discharge test
         if id0 == id1:
-            max_id = data.tc2.idxmax()
-            data.time = data.time[:max_id + 1] - data.time[:max_id + 1][0]
-            data.tc1 = data.tc1[:max_id + 1]
-            data.tc2 = data.tc2[:max_id + 1]
-            data.tc3 = data.tc3[:max_id + 1]
-            data.tc4 = data.tc4[:max_id + 1]
-            data.tmax = data.tmax[:max_id + 1]
-            data.tavg = data.tavg[:max_id + 1]
-            data.tmin = data.tmin[:max_id + 1]
+            max_id = int(np.argmax(data.tc2))
+            section = slice(0, max_id + 1)
         else:
-            data.time = data.time[id0:id1 + 1] - data.time[id0:id1 + 1][0]
-            data.tc1 = data.tc1[id0:id1 + 1]
-            data.tc2 = data.tc2[id0:id1 + 1]
-            data.tc3 = data.tc3[id0:id1 + 1]
-            data.tc4 = data.tc4[id0:id1 + 1]
-            data.tmax = data.tmax[id0:id1 + 1]
-            data.tavg = data.tavg[id0:id1 + 1]
-            data.tmin = data.tmin[id0:id1 + 1]
+            section = slice(id0, id1 + 1)
+
+        data.time = data.time[section] - data.time[section][0]
+        data.block = data.block[section]
+        data.stats = data.stats[section]
+        data._set_views()
 
         return data
@@ -0,0 +1,111 @@
+import numpy as np
+
+
+class DataBlock:
+    """
+    Compact container for battery test data. The numeric channels are stored
+    as one C-contiguous array with a column for each channel and the flags,
+    if any, are stored as one array of strings along with the integer code
+    of each flag. Each channel is a view of a
+    column and a window of rows is a view of the arrays, so slicing a test
+    section does not copy the data.
+
+    Parameters
+    ----------
+    values : ndarray
+        Numeric data with shape (n_rows, n_channels).
+    names : tuple
+        Name of each channel.
+    flags : vector, optional
+        Flag for each row. Default is `None` for no flags.
+    flag_name : str, optional
+        Name used to get the flags with `block[flag_name]`. Default is
+        'flags'.
+    codes : vector, optional
+        Integer code of the flag for each row. Default is `None`.
+    categories : vector, optional
+        Flag value for each code. Default is `None`.
+
+    Methods
+    -------
+    from_columns(columns, flags, flag_name)
+        Create block from separate arrays for each channel.
+    window(start, stop)
+        Rows of the block from start up to but not including stop.
+    """
+
+    __slots__ = ('values', 'names', 'flags', 'flag_name', 'codes', 'categories', '_cols')
+
+    def __init__(self, values, names, flags=None, flag_name='flags', codes=None, categories=None):
+        """
+        Initialize with numeric data, channel names, and flags.
+        """
+        self.values = values
+        self.names = tuple(names)
+        self.flags = flags
+        self.flag_name = flag_name
+        self.codes = codes
+        self.categories = categories
+        self._cols = {name: k for k, name in enumerate(self.names)}
+
+    @classmethod
+    def from_columns(cls, columns, flags=None, flag_name='flags'):
+        """
+        Create a block by copying the arrays for each channel into one array.
+
+        Parameters
+        ----------
+        columns : dict
+            Array for each channel name.
+        flags : vector, optional
+            Flag for each row. Default is `None` for no flags.
+        flag_name : str, optional
+            Name used to get the flags. Default is 'flags'.
+
+        Returns
+        -------
+        block : DataBlock
+            Data for all the channels.
+        """
+        arrays = list(columns.values())
+        nrows = len(arrays[0]) if arrays else 0
+        dtype = np.result_type(*arrays) if arrays else np.float64
+        values = np.empty((nrows, len(arrays)), dtype=dtype)
+        for k, arr in enumerate(arrays):
+            values[:, k] = arr
+        return cls(values, columns.keys(), flags, flag_name)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, name):
+        return name in self._cols or (self.flags is not None and name == self.flag_name)
+
+    def __getitem__(self, key):
+        """
+        Column view for a channel name, the flags for the flag name, or a
+        window of rows for a slice.
+        """
+        if isinstance(key, slice):
+            flags = None if self.flags is None else self.flags[key]
+            codes = None if self.codes is None else self.codes[key]
+            return DataBlock(self.values[key], self.names, flags, self.flag_name, codes, self.categories)
+        if self.flags is not None and key == self.flag_name:
+            return self.flags
+        return self.values[:, self._cols[key]]
+
+    @property
+    def nbytes(self):
+        """
+        Size of the data in the block [bytes]
+        """
+        flag_bytes = 0 if self.flags is None else self.flags.nbytes
+        code_bytes = 0 if self.codes is None else self.codes.nbytes
+        return self.values.nbytes + flag_bytes + code_bytes
+
+    def window(self, start, stop=None):
+        """
+        Rows of the block from `start` up to but not including `stop`. The
+        returned block is a view of this block.
+        """
+        return self[start:stop]
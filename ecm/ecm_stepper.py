@@ -0,0 +1,292 @@
+import math
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+
+class EcmStepper:
+    """
+    Stateful equivalent circuit model (ECM) that advances one time step at a
+    time. This is used for real-time or hardware-in-the-loop simulations where
+    current samples arrive one at a time and the terminal voltage is needed
+    immediately.
+
+    Parameters
+    ----------
+    rctau : array
+        RC parameters for each 10% SOC section from `rctau_ttc()`.
+    v_pts : vector
+        Open circuit voltage points from `ocv(soc, pts=True)` [V]
+    z_pts : vector
+        State of charge points from `ocv(soc, pts=True)` [-]
+    q : float
+        Total capacity of the battery cell or battery module [Ah]
+    eta_chg : float
+        Coulombic efficiency for charge [-]
+    eta_dis : float
+        Coulombic efficiency for discharge [-]
+    zi : float, optional
+        Initial state of charge [-]. Default value is 1.0.
+    ti : float, optional
+        Initial temperature [K]. Default value is 298.15.
+    thermal : tuple, optional
+        Thermal parameters given as (h_conv, a_surf, tinf, m, cp). Default is
+        `None` where the temperature is held constant.
+
+    Attributes
+    ----------
+    state : vector
+        Current state of the model as [soc, v1, v2, temp, q_irrev]. The array
+        is preallocated and updated in place by every step.
+
+    Methods
+    -------
+    from_ecm(ecm, rctau, v_pts, z_pts)
+        Create stepper from a fitted cell or module ECM.
+    reset(zi, ti)
+        Reset state of the model.
+    step(i, dt)
+        Advance one time step and return the terminal voltage.
+    step_many(i_block, dt_block)
+        Advance several time steps and return the terminal voltages.
+    """
+
+    def __init__(self, rctau, v_pts, z_pts, q, eta_chg, eta_dis, zi=1.0, ti=298.15, thermal=None):
+        """
+        Initialize with RC parameters, open circuit voltage points, and
+        battery parameters.
+        """
+        self.rctau = np.asarray(rctau, dtype=float)
+        self.q = q
+        self.eta_chg = eta_chg
+        self.eta_dis = eta_dis
+
+        # open circuit voltage points in ascending order of state of charge
+        self._z_asc = np.asarray(z_pts, dtype=float)[::-1].copy()
+        self._v_asc = np.asarray(v_pts, dtype=float)[::-1].copy()
+        self._z_list = self._z_asc.tolist()
+        self._v_list = self._v_asc.tolist()
+
+        # 10% SOC sections in ascending order and RC parameters for each row
+        self._soc_list = np.arange(0.1, 1.0, 0.1).tolist()
+        self._rows = [tuple(row) for row in self.rctau[:, :5].tolist()]
+
+        if thermal is None:
+            self._ha = 0.0
+            self._tinf = 0.0
+            self._mcp = math.inf
+        else:
+            h_conv, a_surf, tinf, m, cp = thermal
+            self._ha = h_conv * a_surf
+            self._tinf = tinf
+            self._mcp = m * cp
+
+        # exponential factors are reused while the row and time step are unchanged
+        self._last_row = -1
+        self._last_dt = math.nan
+        self._a1 = 0.0
+        self._a2 = 0.0
+
+        self._buf = array('d', [0.0] * 5)
+        self.state = np.frombuffer(self._buf)
+        self.reset(zi, ti)
+
+    @classmethod
+    def from_ecm(cls, ecm, rctau, v_pts, z_pts, zi=1.0, ti=298.15, tm=None):
+        """
+        Create a stepper from a fitted `CellEcm` or `ModuleEcm`.
+
+        Parameters
+        ----------
+        ecm : CellEcm or ModuleEcm
+            Equivalent circuit model with capacity and coulombic efficiency.
+        rctau : array
+            RC parameters for each 10% SOC section.
+        v_pts : vector
+            Open circuit voltage points [V]
+        z_pts : vector
+            State of charge points [-]
+        zi : float, optional
+            Initial state of charge [-]. Default value is 1.0.
+        ti : float, optional
+            Initial temperature [K]. Default value is 298.15.
+        tm : ThermalModel, optional
+            Thermal model for the battery cell. Module models use the thermal
+            parameters of the module by default.
+
+        Returns
+        -------
+        stepper : EcmStepper
+            Stepper initialized at the given state of charge and temperature.
+        """
+        q = getattr(ecm, 'q_cell', None) or getattr(ecm, 'q_module')
+
+        if tm is not None:
+            thermal = tm.h, tm.sa, tm.tf, tm.m, tm.cp
+        elif hasattr(ecm, 'm_module'):
+            thermal = ecm.h_conv, ecm.a_surf, ecm.tinf, ecm.m_module, ecm.cp_module
+        else:
+            thermal = None
+
+        return cls(rctau, v_pts, z_pts, q, ecm.eta_chg, ecm.eta_dis, zi=zi, ti=ti, thermal=thermal)
+
+    @property
+    def soc(self):
+        return self._buf[0]
+
+    @property
+    def temp(self):
+        return self._buf[3]
+
+    def reset(self, zi=1.0, ti=298.15):
+        """
+        Reset state of charge and temperature. Voltages in the RC branches are
+        set to zero.
+        """
+        buf = self._buf
+        buf[0] = zi
+        buf[1] = 0.0
+        buf[2] = 0.0
+        buf[3] = ti
+        buf[4] = 0.0
+
+    def _ocv(self, z):
+        """
+        Linear interpolation of open circuit voltage for a single SOC.
+        """
+        zs = self._z_list
+        vs = self._v_list
+        if z <= zs[0]:
+            return vs[0]
+        if z >= zs[-1]:
+            return vs[-1]
+        k = bisect_left(zs, z)
+        z0 = zs[k - 1]
+        v0 = vs[k - 1]
+        return v0 + (vs[k] - v0) * (z - z0) / (zs[k] - z0)
+
+    def _row(self, z):
+        """
+        Row of the RC parameters for a single SOC, same as `soc_index()`.
+        """
+        soc = self._soc_list
+        n = len(soc) - 1
+        pos = bisect_left(soc, z)
+        lo = min(max(pos - 1, 0), n)
+        hi = min(pos, n)
+        if abs(soc[hi] - z) <= abs(soc[lo] - z):
+            return n - hi
+        return n - lo
+
+    def step(self, i, dt):
+        """
+        Advance the model by one time step.
+
+        Parameters
+        ----------
+        i : float
+            Current applied during the time step [A]
+        dt : float
+            Length of the time step [s]
+
+        Returns
+        -------
+        vt : float
+            Terminal voltage at the end of the time step [V]
+        """
+        buf = self._buf
+        z, v1, v2, temp, q_irrev = buf
+
+        # temperature from heat generated in the previous time step
+        temp += ((q_irrev + self._ha * (self._tinf - temp)) / self._mcp) * dt
+
+        # state of charge from coulomb counting
+        eta = self.eta_chg if i > 0 else self.eta_dis
+        z += (eta * i * dt) / (self.q * 3600)
+
+        # RC parameters and exponential factors at state of charge
+        row = self._row(z)
+        tau1, tau2, r0, r1, r2 = self._rows[row]
+        if row != self._last_row or dt != self._last_dt:
+            self._a1 = math.exp(-dt / tau1)
+            self._a2 = math.exp(-dt / tau2)
+            self._last_row = row
+            self._last_dt = dt
+        a1 = self._a1
+        a2 = self._a2
+
+        v1 = v1 * a1 + r1 * (1 - a1) * i
+        v2 = v2 * a2 + r2 * (1 - a2) * i
+        ocv = self._ocv(z)
+        vt = ocv + r0 * i + v1 + v2
+
+        buf[0] = z
+        buf[1] = v1
+        buf[2] = v2
+        buf[3] = temp
+        buf[4] = i * (vt - ocv)
+        return vt
+
+    def step_many(self, i_block, dt_block, out=None):
+        """
+        Advance the model by several time steps at once.
+
+        Parameters
+        ----------
+        i_block : vector
+            Current applied during each time step [A]
+        dt_block : float or vector
+            Length of each time step [s]
+        out : vector, optional
+            Preallocated array for the terminal voltages. Default is `None`
+            where a new array is returned.
+
+        Returns
+        -------
+        vt : vector
+            Terminal voltage at the end of each time step [V]
+        """
+        # kernels import Numba, so they are only loaded when a block is stepped
+        from .kernels import linear_recurrence, soc_index
+
+        i = np.asarray(i_block, dtype=float)
+        dt = np.broadcast_to(np.asarray(dt_block, dtype=float), i.shape)
+        buf = self._buf
+        z0, v10, v20, temp0, q_irrev0 = buf
+
+        if out is None:
+            out = np.empty(i.shape)
+
+        if len(i) == 0:
+            return out
+
+        # state of charge from coulomb counting
+        eta = np.where(i > 0, self.eta_chg, self.eta_dis)
+        z = z0 + np.cumsum((eta * i * dt) / (self.q * 3600))
+
+        # RC parameters at state of charge and voltage in each RC branch
+        rt = self.rctau[soc_index(z)]
+        a1 = np.exp(-dt / rt[:, 0])
+        a2 = np.exp(-dt / rt[:, 1])
+        v1 = linear_recurrence(a1, rt[:, 3] * (1 - a1) * i, y0=v10)
+        v2 = linear_recurrence(a2, rt[:, 4] * (1 - a2) * i, y0=v20)
+
+        ocv = np.interp(z, self._z_asc, self._v_asc)
+        np.add(ocv, rt[:, 2] * i, out=out)
+        out += v1
+        out += v2
+
+        # temperature from heat generated in the previous time step
+        q_irrev = i * (out - ocv)
+        q_prev = np.concatenate(([q_irrev0], q_irrev[:-1]))
+        a = 1 - (self._ha / self._mcp) * dt
+        b = ((q_prev + self._ha * self._tinf) / self._mcp) * dt
+        temps = linear_recurrence(a, b, y0=temp0)
+
+        buf[0] = z[-1]
+        buf[1] = v1[-1]
+        buf[2] = v2[-1]
+        buf[3] = temps[-1]
+        buf[4] = q_irrev[-1]
+        return out
@@ -0,0 +1,291 @@
+"""
+Curve fitting of the exponential relaxation for each 10% SOC section of the
+HPPC data.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+from scipy.optimize import curve_fit, least_squares
+
+METHODS = ('curve_fit', 'varpro')
+
+
+def _projection(t, v, rates):
+    """
+    Solve the linear coefficients of v = a - b * exp(-alpha * t) - ... for
+    fixed rates and return the coefficients and residual.
+    """
+    x = np.empty((len(t), len(rates) + 1))
+    x[:, 0] = 1.0
+    x[:, 1:] = -np.exp(-np.outer(t, rates))
+    lin, *_ = np.linalg.lstsq(x, v, rcond=None)
+    resid = x @ lin - v
+    return lin, resid
+
+
+def _exp_model(t, coeffs):
+    """
+    Exponential function a - b * exp(-alpha * t) - ... for OTC or TTC
+    coefficients given as (a, b, alpha) or (a, b, c, alpha, beta).
+    """
+    nexp = (len(coeffs) - 1) // 2
+    lin = np.asarray(coeffs[1:nexp + 1], dtype=float)
+    rates = np.asarray(coeffs[nexp + 1:], dtype=float)
+    return coeffs[0] - np.exp(-np.outer(t, rates)) @ lin
+
+
+def _check_method(method, func, t, guess, kwargs):
+    """
+    Raise an error for an unknown fit method or for a function or keyword
+    arguments that the variable projection fit cannot use.
+    """
+    if method not in METHODS:
+        raise ValueError(f'Method must be one of {METHODS}, got {method!r}')
+
+    if method != 'varpro':
+        return
+
+    if len(guess) not in (3, 5):
+        raise ValueError('Method varpro needs 3 coefficients for OTC or 5 coefficients for TTC')
+
+    unused = set(kwargs) - {'maxfev'}
+    if unused:
+        raise ValueError(f'Method varpro does not support the arguments {sorted(unused)}')
+
+    # the function is only used to confirm it is the OTC or TTC function
+    t = np.asarray(t, dtype=float)
+    try:
+        v_func = func(t, *guess)
+    except TypeError:
+        v_func = None
+    if v_func is None or not np.allclose(v_func, _exp_model(t, guess)):
+        raise ValueError('Method varpro only fits the OTC and TTC exponential functions')
+
+
+def fit_section_varpro(t, v, guess, ngrid=20, maxfev=None):
+    """
+    Curve fit coefficients of the one time constant (OTC) or two time
+    constants (TTC) exponential function for a single SOC section with
+    variable projection. The function is linear in `a`, `b`, and `c` which
+    are solved in closed form for any rates `alpha` and `beta`. Only the rates
+    are searched, first on a log-spaced grid and then refined with nonlinear
+    least squares. The grid search makes the fit robust to a poor initial
+    guess of the rates, but it is not faster than `scipy.optimize.curve_fit`
+    with an analytic Jacobian. On the cell HPPC sections it is about 3-7x
+    slower.
+
+    Parameters
+    ----------
+    t : vector
+        Time that starts at zero for the section [s]
+    v : vector
+        Voltage for the section [V]
+    guess : tuple
+        Initial guess of the coefficients as (a, b, alpha) for OTC or
+        (a, b, c, alpha, beta) for TTC. The rates in the guess are included
+        in the grid search and their order sets the order of the rates in the
+        returned coefficients.
+    ngrid : int, optional
+        Number of rates in the log-spaced grid. Default value is 20.
+    maxfev : int, optional
+        Maximum number of evaluations of the projected residual when the
+        rates are refined. Default is `None` for the least squares default.
+
+    Returns
+    -------
+    popt : vector
+        Curve fit coefficients for the section.
+    nfev : int
+        Number of projections of the linear coefficients which includes every
+        rate combination of the grid search.
+    """
+    t = np.asarray(t, dtype=float)
+    v = np.asarray(v, dtype=float)
+    nexp = (len(guess) - 1) // 2
+    guess_rates = np.asarray(guess[nexp + 1:], dtype=float)
+
+    dt = np.diff(t)
+    steps = dt[dt > 0]
+    if len(t) < len(guess):
+        raise ValueError(f'Section has {len(t)} samples but {len(guess)} coefficients are fit')
+    if len(steps) == 0:
+        raise ValueError('Section has no positive time steps')
+
+    # grid of rates between the length of the section and the time step
+    span = t[-1] - t[0]
+    dt_min = steps.min()
+    grid = np.logspace(np.log10(0.1 / span), np.log10(1 / dt_min), ngrid)
+    rates = np.concatenate((grid, guess_rates))
+    cols = np.array(list(combinations(range(ngrid), nexp)) + [tuple(range(ngrid, ngrid + nexp))])
+
+    # coefficients of every candidate from the normal equations of all columns
+    x = np.empty((len(t), len(rates) + 1))
+    x[:, 0] = 1.0
+    x[:, 1:] = -np.exp(-np.outer(t, rates))
+    gram = x.T @ x
+    xv = x.T @ v
+    idx = np.column_stack((np.zeros(len(cols), dtype=int), cols + 1))
+    g = gram[idx[:, :, np.newaxis], idx[:, np.newaxis, :]]
+    r = xv[idx]
+    try:
+        lin = np.linalg.solve(g, r[..., np.newaxis])[..., 0]
+    except np.linalg.LinAlgError:
+        lin = np.array([np.linalg.lstsq(gk, rk, rcond=None)[0] for gk, rk in zip(g, r)])
+    resid = np.einsum('tck,ck->ct', x[:, idx], lin) - v
+    sse = np.sum(resid**2, axis=1)
+    rates0 = rates[cols[int(np.argmin(sse))]]
+
+    # refine the rates where the linear coefficients are projected out
+    nproj = len(cols)
+
+    def residual(log_rates):
+        nonlocal nproj
+        nproj += 1
+        return _projection(t, v, np.exp(log_rates))[1]
+
+    sol = least_squares(residual, np.log(rates0), method='lm', max_nfev=maxfev)
+    rates = np.exp(sol.x)
+
+    # order of the rates follows the order of the rates in the guess
+    if nexp == 2 and (guess_rates[0] > guess_rates[1]) != (rates[0] > rates[1]):
+        rates = rates[::-1]
+
+    lin, _ = _projection(t, v, rates)
+    popt = np.concatenate((lin, rates))
+    nfev = nproj + 1
+    return popt, nfev
+
+
+def jac_otc(t, a, b, alpha):
+    """
+    Jacobian of the one time constant function with respect to the
+    coefficients a, b, and alpha.
+    """
+    e = np.exp(-alpha * t)
+    return np.column_stack((np.ones_like(t), -e, b * t * e))
+
+
+def jac_ttc(t, a, b, c, alpha, beta):
+    """
+    Jacobian of the two time constants function with respect to the
+    coefficients a, b, c, alpha, and beta.
+    """
+    e1 = np.exp(-alpha * t)
+    e2 = np.exp(-beta * t)
+    return np.column_stack((np.ones_like(t), -e1, -e2, b * t * e1, c * t * e2))
+
+
+def fit_section(func, t, v, guess, kwargs, method='curve_fit'):
+    """
+    Curve fit coefficients for a single SOC section. A `ValueError` is raised
+    for an unknown method. For 'varpro' it is also raised when `func` is not
+    the OTC or TTC function or `kwargs` has arguments other than `maxfev`.
+
+    Parameters
+    ----------
+    func : function
+        Exponential function defining the curve.
+    t : vector
+        Time that starts at zero for the section [s]
+    v : vector
+        Voltage for the section [V]
+    guess : tuple
+        Initial guess of the coefficients.
+    kwargs : dict
+        Other keyword arguments for `scipy.optimize.curve_fit`. Only
+        `maxfev` is used by the variable projection fit.
+    method : str, optional
+        Use 'curve_fit' for `scipy.optimize.curve_fit` or 'varpro' for the
+        variable projection fit of the OTC and TTC functions. Default value
+        is 'curve_fit'.
+
+    Returns
+    -------
+    popt : vector
+        Curve fit coefficients for the section.
+    nfev : int
+        Number of function evaluations used by the curve fit.
+    """
+    _check_method(method, func, t, guess, kwargs)
+
+    if method == 'varpro':
+        return fit_section_varpro(t, v, guess, maxfev=kwargs.get('maxfev'))
+
+    popt, pcov, infodict, _, _ = curve_fit(func, t, v, p0=guess, full_output=True, **kwargs)
+    return popt, infodict['nfev']
+
+
+def fit_sections(func, sections, kwargs=None, executor=None, n_jobs=None, warm_start=False, method='curve_fit'):
+    """
+    Curve fit coefficients for several SOC sections. The sections are
+    independent so they can be fit at the same time on a thread or process
+    pool. For a warm start, the sections are fit one after another and each
+    section is seeded with the coefficients of the previous SOC section.
+
+    Parameters
+    ----------
+    func : function
+        Exponential function defining the curve.
+    sections : list
+        Time, voltage, and initial guess given as (t, v, guess) for each
+        section.
+    kwargs : dict, optional
+        Other keyword arguments for `scipy.optimize.curve_fit`.
+    executor : Executor, optional
+        Thread or process pool from `concurrent.futures` used to fit the
+        sections. Default is `None`.
+    n_jobs : int, optional
+        Number of processes used to fit the sections when an executor is not
+        given. The curve fit objective is Python code that holds the GIL, so
+        a process pool is used instead of a thread pool. The function and
+        keyword arguments must be picklable such as the static methods of
+        `CellEcm` and `ModuleEcm`. Use -1 for the number of processors.
+        Default is `None` where the sections are fit one after another.
+    warm_start : bool, optional
+        Seed each section with the converged coefficients of the previous
+        section. The first coefficient of the guess, which is the final
+        voltage of the section, is always taken from the section guess. The
+        executor and number of jobs are not used for a warm start. Default
+        value is `False`.
+    method : str, optional
+        Use 'curve_fit' for `scipy.optimize.curve_fit` or 'varpro' for the
+        variable projection fit of the OTC and TTC functions. Default value
+        is 'curve_fit'.
+
+    Returns
+    -------
+    coeffs : list
+        Curve fit coefficients for each section.
+    nfev : list
+        Number of function evaluations for each section.
+    """
+    if kwargs is None:
+        kwargs = {}
+
+    if warm_start:
+        results = []
+        popt = None
+        for t, v, guess in sections:
+            if popt is not None:
+                guess = (guess[0],) + tuple(popt[1:])
+            popt, nfev = fit_section(func, t, v, guess, kwargs, method)
+            results.append((popt, nfev))
+
+    elif executor is None and n_jobs is not None and n_jobs != 1:
+        max_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            return fit_sections(func, sections, kwargs, executor=pool, method=method)
+
+    elif executor is None:
+        results = [fit_section(func, t, v, guess, kwargs, method) for t, v, guess in sections]
+
+    else:
+        futures = [executor.submit(fit_section, func, t, v, guess, kwargs, method) for t, v, guess in sections]
+        results = [future.result() for future in futures]
+
+    coeffs = [popt for popt, _ in results]
+    nfev = [n for _, n in results]
+    return coeffs, nfev
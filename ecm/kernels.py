@@ -0,0 +1,647 @@
+"""
+Vectorized calculations shared by the cell and module equivalent circuit
+models.
+
+The sequential loops for state of charge, RC branch voltages, and temperature
+are compiled with Numba when it is installed. Compiled kernels release the GIL
+so several simulations can run at once in a thread pool. Without Numba the
+calculations fall back to NumPy. Set `USE_NUMBA = False` to always use the
+NumPy calculations.
+"""
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+HAS_NUMBA = numba is not None
+USE_NUMBA = HAS_NUMBA
+
+
+def _jit(func):
+    """
+    Compile a loop kernel with Numba if it is available, otherwise return the
+    Python function which is only used for reference.
+    """
+    if numba is None:
+        return func
+    return numba.njit(nogil=True, cache=True)(func)
+
+
+@_jit
+def _soc_loop(current, dt, q, eta_chg, eta_dis, zi, z):
+    """
+    Coulomb counting for each row of current where `q` is in As.
+    """
+    nrow, nc = current.shape
+    for r in range(nrow):
+        z[r, 0] = zi[r]
+        for k in range(1, nc):
+            i = current[r, k]
+            if i > 0:
+                eta = eta_chg
+            else:
+                eta = eta_dis
+            z[r, k] = z[r, k - 1] + ((eta * i * dt[k - 1]) / q[r])
+
+
+@_jit
+def _recurrence_loop(a, b, y0, y):
+    """
+    Recurrence y[k] = a[k] * y[k - 1] + b[k] for each row.
+    """
+    nrow, nc = a.shape
+    for r in range(nrow):
+        yk = y0[r]
+        for k in range(nc):
+            yk = a[r, k] * yk + b[r, k]
+            y[r, k] = yk
+
+
+@_jit
+def _temperature_loop(current, ocv, vt, dt, ha, tinf, mcp, ti, q_gen, temps):
+    """
+    Lumped temperature from irreversible heat generation and convection.
+    """
+    temps[0] = ti
+    for k in range(len(dt)):
+        q_irrev = current[k] * (vt[k] - ocv[k])
+        q_conv = ha * (tinf - temps[k])
+        q = q_irrev + q_conv
+        q_gen[k + 1] = q
+        temps[k + 1] = temps[k] + (q / mcp) * dt[k]
+
+
+@_jit
+def _coupled_loop(i_pack, dt, zi, q, eta_chg, eta_dis, rct, soc, z_asc, v_asc, starts, weights, i, z, vt):
+    """
+    Coupled current split and state of each cell where `q` is in As. Outputs
+    have shape (n_steps, n_cells) so each time step writes contiguous memory.
+    """
+    nc, n_cells = i.shape
+    n_groups = len(starts) - 1
+    nsoc = len(soc)
+    npts = len(z_asc)
+    v1 = np.zeros(n_cells)
+    v2 = np.zeros(n_cells)
+    zk = zi.copy()
+    e = np.empty(n_cells)
+    g = np.empty(n_cells)
+    a1 = np.empty(n_cells)
+    a2 = np.empty(n_cells)
+    rows = np.full(n_cells, -1)
+    h_last = np.nan
+
+    for k in range(nc):
+        h = dt[k - 1] if k > 0 else 0.0
+        new_h = h != h_last
+        h_last = h
+
+        # open circuit voltage, RC factors, and resistance of each cell
+        for c in range(n_cells):
+            zc = zk[c]
+            pos = np.searchsorted(soc, zc)
+            lo = min(max(pos - 1, 0), nsoc - 1)
+            hi = min(pos, nsoc - 1)
+            near = hi if abs(soc[hi] - zc) <= abs(soc[lo] - zc) else lo
+            row = nsoc - 1 - near
+
+            # exponential factors only change with the SOC section or time step
+            if new_h or row != rows[c]:
+                rows[c] = row
+                a1[c] = np.exp(-h / rct[c, row, 0])
+                a2[c] = np.exp(-h / rct[c, row, 1])
+                g[c] = 1.0 / (rct[c, row, 2] + rct[c, row, 3] * (1 - a1[c]) + rct[c, row, 4] * (1 - a2[c]))
+
+            if zc <= z_asc[0]:
+                ocv = v_asc[0]
+            elif zc >= z_asc[npts - 1]:
+                ocv = v_asc[npts - 1]
+            else:
+                j = np.searchsorted(z_asc, zc)
+                ocv = v_asc[j - 1] + (v_asc[j] - v_asc[j - 1]) * (zc - z_asc[j - 1]) / (z_asc[j] - z_asc[j - 1])
+            e[c] = ocv + a1[c] * v1[c] + a2[c] * v2[c]
+
+        # cells in parallel share the module voltage and sum to the pack current
+        for s in range(n_groups):
+            gsum = 0.0
+            gesum = 0.0
+            for c in range(starts[s], starts[s + 1]):
+                gsum += weights[c] * g[c]
+                gesum += weights[c] * g[c] * e[c]
+            v_module = (i_pack[k] + gesum) / gsum
+            for c in range(starts[s], starts[s + 1]):
+                i[k, c] = g[c] * (v_module - e[c])
+                vt[k, c] = v_module
+
+        for c in range(n_cells):
+            if k > 0:
+                ic = i[k, c]
+                row = rows[c]
+                v1[c] = a1[c] * v1[c] + rct[c, row, 3] * (1 - a1[c]) * ic
+                v2[c] = a2[c] * v2[c] + rct[c, row, 4] * (1 - a2[c]) * ic
+                eta = eta_chg if ic > 0 else eta_dis
+                zk[c] += (eta * ic * h) / q[c]
+            z[k, c] = zk[c]
+
+
+def soc_coulomb(current, time, q, eta_chg, eta_dis, zi=1.0):
+    """
+    State of charge (SOC) from coulomb counting. The efficiency for each time
+    step is selected with a mask on the sign of the current and the SOC is
+    accumulated with a cumulative sum over the time steps.
+
+    Parameters
+    ----------
+    current : vector
+        Current at every time step [A]
+    time : vector
+        Time at every time step [s]
+    q : float or vector
+        Total capacity of the battery [Ah]
+    eta_chg : float
+        Coulombic efficiency for charge [-]
+    eta_dis : float
+        Coulombic efficiency for discharge [-]
+    zi : float or vector, optional
+        Initial state of charge [-]. Default value is 1.0.
+
+    Returns
+    -------
+    z : vector
+        State of charge at every time step [-]
+
+    Note
+    ----
+    A 2-D current array of shape (n_cells, n_steps) returns the SOC of every
+    cell in one pass. In that case `q` and `zi` can be given per cell as
+    vectors of length n_cells.
+    """
+    current = np.asarray(current, dtype=float)
+    dt = np.diff(time)
+
+    # no time steps gives no state of charge, same as the original loop
+    if current.shape[-1] == 0:
+        return np.empty(current.shape)
+
+    if USE_NUMBA:
+        shape = current.shape
+        rows = current.reshape(-1, shape[-1])
+        qs = np.broadcast_to(np.asarray(q, dtype=float) * 3600, shape[:-1]).ravel()
+        zis = np.broadcast_to(np.asarray(zi, dtype=float), shape[:-1]).ravel()
+        z = np.empty(rows.shape)
+        _soc_loop(rows, dt, qs, eta_chg, eta_dis, zis, z)
+        return z.reshape(shape)
+
+    q = np.asarray(q, dtype=float)[..., np.newaxis]
+
+    eta = np.where(current[..., 1:] > 0, eta_chg, eta_dis)
+    dz = (eta * current[..., 1:] * dt) / (q * 3600)
+
+    z = np.empty(current.shape)
+    z[..., 0] = zi
+    np.cumsum(dz, axis=-1, out=z[..., 1:])
+    z[..., 1:] += z[..., :1]
+    return z
+
+
+def soc_index(z):
+    """
+    Index of the 10% SOC section for each SOC value. Sections are ordered from
+    90% SOC to 10% SOC which is the same order as the rows in the RC
+    parameters array. The index is the nearest SOC section to `z` and ties are
+    given to the higher SOC section.
+
+    Parameters
+    ----------
+    z : float or vector
+        State of charge [-]
+
+    Returns
+    -------
+    idx : int or vector
+        Row index of the RC parameters array for each SOC value.
+    """
+    soc = np.arange(0.1, 1.0, 0.1)
+    z = np.asarray(z)
+
+    # nearest neighbors of z in the ascending SOC sections
+    pos = np.searchsorted(soc, z)
+    lo = np.clip(pos - 1, 0, len(soc) - 1)
+    hi = np.clip(pos, 0, len(soc) - 1)
+    near = np.where(np.abs(soc[hi] - z) <= np.abs(soc[lo] - z), hi, lo)
+
+    # convert to index of descending SOC sections
+    idx = len(soc) - 1 - near
+    return idx
+
+
+def _scan(a, b):
+    """
+    Vectorized scan of the recurrence y[k] = a[k] * y[k - 1] + b[k] along the
+    last axis. Returns the cumulative coefficients `A` and `B` such that
+    y[k] = A[k] * y0 + B[k] where y0 is the value before the first step.
+    """
+    a = np.array(a, dtype=float)
+    b = np.array(b, dtype=float)
+    n = a.shape[-1]
+
+    d = 1
+    while d < n:
+        b[..., d:] = a[..., d:] * b[..., :-d] + b[..., d:]
+        a[..., d:] = a[..., d:] * a[..., :-d]
+        d *= 2
+
+    return a, b
+
+
+def _recurrence_rows(a, b):
+    """
+    Recurrence y[k] = a[k] * y[k - 1] + b[k] along each row of 2-D arrays
+    where the value before the first step is zero.
+    """
+    if USE_NUMBA:
+        a = np.ascontiguousarray(a, dtype=float)
+        b = np.ascontiguousarray(b, dtype=float)
+        y = np.empty(a.shape)
+        _recurrence_loop(a, b, np.zeros(a.shape[0]), y)
+        return y
+
+    _, y = _scan(a, b)
+    return y
+
+
+def linear_recurrence(a, b, y0=0.0, min_run=32):
+    """
+    Evaluate the first-order linear recurrence y[k] = a[k] * y[k - 1] + b[k]
+    such as the voltage across an RC branch. Runs where the coefficient `a`
+    is constant, which happens when the SOC section and time step do not
+    change, are evaluated as an IIR filter with `scipy.signal.lfilter`. Short
+    runs are evaluated together with a vectorized scan.
+
+    Parameters
+    ----------
+    a : vector
+        Decay coefficient for each step, such as exp(-dt / tau) [-]
+    b : vector
+        Input for each step, such as r * (1 - exp(-dt / tau)) * i [V]
+    y0 : float, optional
+        Value before the first step. Default value is 0.0.
+    min_run : int, optional
+        Minimum length of a constant coefficient run that is evaluated with
+        the IIR filter. Default value is 32.
+
+    Returns
+    -------
+    y : vector
+        Value after each step, same length as `a` and `b`.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    n = len(a)
+    y = np.empty(n)
+
+    if USE_NUMBA:
+        _recurrence_loop(a[np.newaxis], b[np.newaxis], np.array([y0], dtype=float), y[np.newaxis])
+        return y
+
+    # start and stop index of each run of constant coefficients
+    edges = np.concatenate(([0], np.flatnonzero(a[1:] != a[:-1]) + 1, [n]))
+    starts = edges[:-1]
+    stops = edges[1:]
+
+    # when most runs are short then scan the entire vector at once
+    if n == 0 or n / len(starts) < min_run:
+        aa, bb = _scan(a, b)
+        y[:] = aa * y0 + bb
+        return y
+
+    # scipy is imported here so the kernels can be used without scipy
+    from scipy.signal import lfilter
+
+    yk = y0
+    k = 0
+    for start, stop in zip(starts, stops):
+        if stop - start < min_run:
+            continue
+
+        # short runs before this run are evaluated with a scan
+        if k < start:
+            aa, bb = _scan(a[k:start], b[k:start])
+            y[k:start] = aa * yk + bb
+            yk = y[start - 1]
+
+        # long run with constant coefficient is evaluated as an IIR filter
+        ak = a[start]
+        y[start:stop], _ = lfilter([1.0], [1.0, -ak], b[start:stop], zi=[ak * yk])
+        yk = y[stop - 1]
+        k = stop
+
+    if k < n:
+        aa, bb = _scan(a[k:], b[k:])
+        y[k:] = aa * yk + bb
+
+    return y
+
+
+def vt_cells(current, time, soc, ocv, rctau):
+    """
+    Terminal voltage from the equivalent circuit model for several battery
+    cells that share one time vector. All cells are calculated in one pass.
+
+    Parameters
+    ----------
+    current : array
+        Current for each cell, shape is (n_cells, n_steps) [A]
+    time : vector
+        Time shared by all cells, length is n_steps [s]
+    soc : array
+        State of charge for each cell, shape is (n_cells, n_steps) [-]
+    ocv : array
+        Open circuit voltage for each cell, shape is (n_cells, n_steps) [V]
+    rctau : array
+        RC parameters shared by all cells with shape (n_rows, 7) or RC
+        parameters for each cell with shape (n_cells, n_rows, 7).
+
+    Returns
+    -------
+    vt : array
+        Terminal voltage for each cell, shape is (n_cells, n_steps) [V]
+
+    Note
+    ----
+    When the RC parameters are shared, the exponential factors exp(-dt / tau)
+    are calculated once for each SOC section on the shared time grid and then
+    gathered for every cell.
+    """
+    current = np.atleast_2d(current)
+    soc = np.atleast_2d(soc)
+    rctau = np.asarray(rctau)
+
+    dt = np.diff(time)
+    nc = current.shape[-1]
+    i = current[:, 1:]
+    idx = soc_index(soc[:, 1:])
+
+    if rctau.ndim == 2:
+        # exponential factors for every SOC section on the shared time grid
+        steps = np.arange(nc - 1)
+        a1 = np.exp(-dt / rctau[:, 0:1])[idx, steps]
+        a2 = np.exp(-dt / rctau[:, 1:2])[idx, steps]
+        params = rctau[idx]
+    else:
+        cells = np.arange(rctau.shape[0])[:, np.newaxis]
+        params = rctau[cells, idx]
+        a1 = np.exp(-dt / params[..., 0])
+        a2 = np.exp(-dt / params[..., 1])
+
+    r0 = params[..., 2]
+    r1 = params[..., 3]
+    r2 = params[..., 4]
+
+    vt = np.array(ocv, dtype=float) * np.ones(current.shape)
+
+    # voltage in r0 resistor and in c1 and c2 capacitors
+    vt[:, 1:] += r0 * i
+    vt[:, 1:] += _recurrence_rows(a1, r1 * (1 - a1) * i)
+    vt[:, 1:] += _recurrence_rows(a2, r2 * (1 - a2) * i)
+    return vt
+
+
+def temperature_lumped(current, time, ocv, vt, ti, h_conv, a_surf, tinf, m, cp):
+    """
+    Heat generation and lumped temperature of a battery cell or module. Heat
+    is generated by the difference between terminal voltage and open circuit
+    voltage and is removed by convection to the ambient temperature.
+
+    Parameters
+    ----------
+    current : vector
+        Current at every time step [A]
+    time : vector
+        Time at every time step [s]
+    ocv : vector
+        Open circuit voltage at every time step [V]
+    vt : vector
+        Terminal voltage at every time step [V]
+    ti : float
+        Initial temperature [K]
+    h_conv : float
+        Convective heat transfer coefficient [W/(m² K)]
+    a_surf : float
+        Surface area [m²]
+    tinf : float
+        Ambient temperature [K]
+    m : float
+        Mass [kg]
+    cp : float
+        Heat capacity [J/(kg K)]
+
+    Returns
+    -------
+    q_gen : vector
+        Heat generation at every time step [W]
+    temps : vector
+        Temperature at every time step [K]
+    """
+    current = np.asarray(current, dtype=float)
+    ocv = np.asarray(ocv, dtype=float)
+    vt = np.asarray(vt, dtype=float)
+    dt = np.diff(time)
+    ha = h_conv * a_surf
+    mcp = m * cp
+
+    q_gen = np.zeros(len(vt))
+    temps = np.zeros(len(vt))
+
+    if USE_NUMBA:
+        _temperature_loop(current, ocv, vt, dt, ha, tinf, mcp, ti, q_gen, temps)
+        return q_gen, temps
+
+    # temperature is a linear recurrence in the previous temperature
+    q_irrev = current[:-1] * (vt[:-1] - ocv[:-1])
+    a = 1 - (ha / mcp) * dt
+    b = ((q_irrev + ha * tinf) / mcp) * dt
+
+    temps[0] = ti
+    temps[1:] = linear_recurrence(a, b, y0=ti)
+    q_gen[1:] = q_irrev + ha * (tinf - temps[:-1])
+    return q_gen, temps
+
+
+def temperature_cells(current, time, ocv, vt, ti, h_conv, a_surf, tinf, m, cp):
+    """
+    Heat generation and lumped temperature for several battery cells that
+    share one time vector and thermal parameters. All cells are calculated in
+    one pass, see `temperature_lumped()` for a single cell.
+
+    Parameters
+    ----------
+    current : array
+        Current for each cell, shape is (n_cells, n_steps) [A]
+    time : vector
+        Time shared by all cells, length is n_steps [s]
+    ocv : array
+        Open circuit voltage for each cell, shape is (n_cells, n_steps) [V]
+    vt : array
+        Terminal voltage for each cell, shape is (n_cells, n_steps) [V]
+    ti : float or vector
+        Initial temperature of each cell [K]
+    h_conv : float
+        Convective heat transfer coefficient [W/(m² K)]
+    a_surf : float
+        Surface area [m²]
+    tinf : float
+        Ambient temperature [K]
+    m : float
+        Mass [kg]
+    cp : float
+        Heat capacity [J/(kg K)]
+
+    Returns
+    -------
+    q_gen : array
+        Heat generation for each cell, shape is (n_cells, n_steps) [W]
+    temps : array
+        Temperature for each cell, shape is (n_cells, n_steps) [K]
+    """
+    current = np.atleast_2d(np.asarray(current, dtype=float))
+    ocv = np.broadcast_to(ocv, current.shape)
+    vt = np.broadcast_to(vt, current.shape)
+    ti = np.broadcast_to(np.asarray(ti, dtype=float), current.shape[:1])
+    dt = np.diff(time)
+    ha = h_conv * a_surf
+    mcp = m * cp
+
+    q_gen = np.zeros(current.shape)
+    temps = np.zeros(current.shape)
+
+    # temperature is a linear recurrence with the same decay for every cell
+    q_irrev = current[:, :-1] * (vt[:, :-1] - ocv[:, :-1])
+    a = 1 - (ha / mcp) * dt
+    b = ((q_irrev + ha * tinf) / mcp) * dt
+
+    temps[:, 0] = ti
+    temps[:, 1:] = np.cumprod(a) * ti[:, np.newaxis] + _recurrence_rows(np.broadcast_to(a, b.shape), b)
+    q_gen[:, 1:] = q_irrev + ha * (tinf - temps[:, :-1])
+    return q_gen, temps
+
+
+def pack_coupled(i_pack, time, zi, q, eta_chg, eta_dis, rctau, v_pts, z_pts, starts, weights=None):
+    """
+    Current split, state of charge, and terminal voltage of the cells in a
+    series-parallel pack where the split is updated at every time step. Each
+    cell is a voltage source ocv + a1 * v1 + a2 * v2 in series with the
+    resistance r0 + r1 * (1 - a1) + r2 * (1 - a2) of its RC parameters for the
+    time step. Cells in parallel share the module voltage, so the module
+    voltage and cell currents of every module are solved in closed form.
+
+    Parameters
+    ----------
+    i_pack : vector
+        Current applied to the pack at every time step [A]
+    time : vector
+        Time at every time step [s]
+    zi : vector
+        Initial state of charge of each cell [-]
+    q : vector
+        Total capacity of each cell [Ah]
+    eta_chg : float
+        Coulombic efficiency for charge [-]
+    eta_dis : float
+        Coulombic efficiency for discharge [-]
+    rctau : array
+        RC parameters for each cell with shape (n_cells, n_rows, 7).
+    v_pts : vector
+        Open circuit voltage points [V]
+    z_pts : vector
+        State of charge points [-]
+    starts : vector
+        Row of the first cell of each module followed by the number of rows.
+        Cells of the same module are next to each other in the rows.
+    weights : vector, optional
+        Number of identical cells that each row represents in its module.
+        Default is `None` where each row is one cell.
+
+    Returns
+    -------
+    i : array
+        Current of each cell, shape is (n_cells, n_steps) [A]
+    z : array
+        State of charge of each cell, shape is (n_cells, n_steps) [-]
+    vt : array
+        Terminal voltage of each cell which is the module voltage, shape is
+        (n_cells, n_steps) [V]
+
+    Note
+    ----
+    The OCV and RC parameters for a time step are taken at the state of
+    charge of the previous time step, which keeps the solve linear.
+    """
+    i_pack = np.asarray(i_pack, dtype=float)
+    zi = np.asarray(zi, dtype=float)
+    q = np.asarray(q, dtype=float)
+    rct = np.ascontiguousarray(rctau, dtype=float)
+    dt = np.diff(time)
+    soc = np.arange(0.1, 1.0, 0.1)
+    z_asc = np.ascontiguousarray(np.asarray(z_pts, dtype=float)[::-1])
+    v_asc = np.ascontiguousarray(np.asarray(v_pts, dtype=float)[::-1])
+
+    n_cells = len(zi)
+    nc = len(i_pack)
+    starts = np.asarray(starts, dtype=np.int64)
+    weights = np.ones(n_cells) if weights is None else np.asarray(weights, dtype=float)
+    first = starts[:-1]
+    sizes = np.diff(starts)
+    i = np.empty((n_cells, nc))
+    z = np.empty((n_cells, nc))
+    vt = np.empty((n_cells, nc))
+
+    if USE_NUMBA:
+        it = np.empty((nc, n_cells))
+        zt = np.empty((nc, n_cells))
+        vtt = np.empty((nc, n_cells))
+        qs = np.ascontiguousarray(q * 3600 * np.ones(n_cells))
+        _coupled_loop(
+            i_pack, dt, zi.copy(), qs, eta_chg, eta_dis, rct, soc, z_asc, v_asc, starts, weights, it, zt, vtt)
+        i[:] = it.T
+        z[:] = zt.T
+        vt[:] = vtt.T
+        return i, z, vt
+
+    cells = np.arange(n_cells)
+    v1 = np.zeros(n_cells)
+    v2 = np.zeros(n_cells)
+    zk = zi.copy()
+    z[:, 0] = zi
+
+    for k in range(nc):
+        h = dt[k - 1] if k > 0 else 0.0
+
+        # open circuit voltage, RC factors, and resistance of each cell
+        p = rct[cells, soc_index(zk)]
+        a1 = np.exp(-h / p[:, 0])
+        a2 = np.exp(-h / p[:, 1])
+        e = np.interp(zk, z_asc, v_asc) + a1 * v1 + a2 * v2
+        g = 1 / (p[:, 2] + p[:, 3] * (1 - a1) + p[:, 4] * (1 - a2))
+
+        # cells in parallel share the module voltage and sum to the pack current
+        gw = weights * g
+        v_module = (i_pack[k] + np.add.reduceat(gw * e, first)) / np.add.reduceat(gw, first)
+        vk = np.repeat(v_module, sizes)
+        ik = g * (vk - e)
+        i[:, k] = ik
+        vt[:, k] = vk
+
+        if k == 0:
+            continue
+
+        v1 = a1 * v1 + p[:, 3] * (1 - a1) * ik
+        v2 = a2 * v2 + p[:, 4] * (1 - a2) * ik
+        eta = np.where(ik > 0, eta_chg, eta_dis)
+        zk = zk + (eta * ik * h) / (q * 3600)
+        z[:, k] = zk
+
+    return i, z, vt
@@ -0,0 +1,545 @@
+"""
+Shared readers for the battery test data files.
+
+Parsed arrays are stored in a binary sidecar cache the first time a file is
+read. Later reads memory-map the cached arrays instead of parsing the text
+file again. The cache for a file is rebuilt when the modified time or size of
+the file changes. By default the cache is stored in an `.ecm_cache` folder
+next to the data file. Set `CACHE_DIR` to store the cache in another folder or
+set `USE_CACHE = False` to always parse the text file.
+
+Arrays that are read are also kept in memory so data classes created again
+for the same file, such as in the `process()` methods, share the same arrays
+instead of reading the file again. The least recently used files are removed
+from memory when the arrays use more than `MEMORY_CACHE_BYTES`. Set
+`MEMORY_CACHE_BYTES = 0` to not keep arrays in memory.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+from .data_block import DataBlock
+
+USE_CACHE = True
+CACHE_DIR = None
+MEMORY_CACHE_BYTES = 500_000_000
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+
+EMPTY_INDEX = np.empty(0, dtype=np.intp)
+EMPTY_INDEX.flags.writeable = False
+
+
+def _cache_path(path, options):
+    """
+    Folder of the sidecar cache for a data file and the options used to parse
+    the file.
+    """
+    path = os.path.abspath(path)
+    key = hashlib.sha1(repr((path, options)).encode()).hexdigest()[:16]
+
+    if CACHE_DIR is None:
+        cache_dir = os.path.join(os.path.dirname(path), '.ecm_cache')
+    else:
+        cache_dir = CACHE_DIR
+
+    return os.path.join(cache_dir, f'{os.path.basename(path)}.{key}')
+
+
+def _write_cache(folder, data, stat):
+    """
+    Write arrays to the sidecar cache folder. Each file is written to a
+    temporary file then moved into place so existing memory maps are not
+    changed. The metadata file is written last and marks the cache as valid.
+    """
+    os.makedirs(folder, exist_ok=True)
+
+    def replace(name, write):
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp, os.path.join(folder, name))
+
+    names = list(data)
+    for k, name in enumerate(names):
+        replace(f'{k}.npy', lambda f: np.save(f, np.asarray(data[name]), allow_pickle=False))
+
+    meta = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'names': names}
+    replace('meta.json', lambda f: f.write(json.dumps(meta).encode()))
+
+
+def _memory_get(key, stat):
+    """
+    Arrays for a file from the memory cache or `None` if the file is not in
+    the cache or has changed since it was read.
+    """
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        mtime_ns, size, _, data = entry
+        if mtime_ns != stat.st_mtime_ns or size != stat.st_size:
+            del _memory[key]
+            return None
+        _memory.move_to_end(key)
+        return dict(data)
+
+
+def _memory_put(key, stat, data):
+    """
+    Store arrays for a file in the memory cache then remove the least recently
+    used files until the cache is within `MEMORY_CACHE_BYTES`. The arrays are
+    made read-only because they are shared by every reader of the file.
+    """
+    nbytes = sum(np.asarray(arr).nbytes for arr in data.values())
+    if nbytes > MEMORY_CACHE_BYTES:
+        return
+
+    for arr in data.values():
+        arr.flags.writeable = False
+
+    with _memory_lock:
+        _memory.pop(key, None)
+        _memory[key] = (stat.st_mtime_ns, stat.st_size, nbytes, dict(data))
+        total = sum(entry[2] for entry in _memory.values())
+        while total > MEMORY_CACHE_BYTES:
+            _, (_, _, size, _) = _memory.popitem(last=False)
+            total -= size
+
+
+def clear_memory_cache():
+    """
+    Remove all arrays from the memory cache.
+    """
+    with _memory_lock:
+        _memory.clear()
+
+
+def cached(path, options, reader):
+    """
+    Read arrays for a data file from the memory cache or the sidecar cache of
+    the file. If the file is in neither cache or has changed, the arrays are
+    read with `reader` and written to both caches.
+
+    Parameters
+    ----------
+    path : str
+        Path to the data file.
+    options : tuple
+        Options used to parse the file. Each set of options has its own cache.
+    reader : function
+        Function with no arguments that parses the file and returns a dict of
+        arrays.
+
+    Returns
+    -------
+    data : dict
+        Array for each name. Arrays from the memory cache are read-only and
+        shared, arrays from the sidecar cache are read-only memory maps.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), options)
+
+    data = _memory_get(key, stat)
+    if data is not None:
+        return data
+
+    if USE_CACHE:
+        data = _read_cached(path, options, reader, stat)
+    else:
+        data = reader()
+
+    _memory_put(key, stat, data)
+    return data
+
+
+def _read_cached(path, options, reader, stat):
+    """
+    Read arrays from the sidecar cache or parse the file with `reader` and
+    write the arrays to the sidecar cache.
+    """
+    folder = _cache_path(path, options)
+
+    try:
+        with open(os.path.join(folder, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+            return {
+                name: np.load(os.path.join(folder, f'{k}.npy'), mmap_mode='r', allow_pickle=False)
+                for k, name in enumerate(meta['names'])
+            }
+    except (OSError, ValueError, KeyError):
+        pass
+
+    data = reader()
+
+    # a read-only data folder only means the cache is not used
+    try:
+        _write_cache(folder, data, stat)
+    except OSError:
+        pass
+
+    return data
+
+
+def flag_codes(flags):
+    """
+    Integer codes and categories of a categorical flag column. Missing flags
+    are given as a space character which is added as the last category if
+    the column does not have it.
+
+    Parameters
+    ----------
+    flags : Series
+        Categorical flag column from the data file.
+
+    Returns
+    -------
+    codes : ndarray
+        Smallest unsigned integer code of the flag for every row [-]
+    categories : ndarray
+        Flag value for each code as an array of strings [-]
+    """
+    categories = flags.cat.categories.astype(str).to_numpy(dtype=str)
+    codes = flags.cat.codes.to_numpy()
+
+    # missing values have code -1 which is replaced by the code of a space
+    space = np.flatnonzero(categories == ' ')
+    if len(space) == 0:
+        space = [len(categories)]
+        categories = np.append(categories, ' ')
+    codes = np.where(codes < 0, space[0], codes).astype(np.min_scalar_type(len(categories) - 1))
+    return codes, categories
+
+
+def flags_to_array(flags):
+    """
+    Convert a categorical flag column to a fixed-width string array. Missing
+    flags are given as a space character.
+
+    Parameters
+    ----------
+    flags : Series
+        Categorical flag column from the data file.
+
+    Returns
+    -------
+    flags : ndarray
+        Flags as an array of strings [-]
+    """
+    codes, categories = flag_codes(flags)
+    return categories[codes]
+
+
+def flag_index(codes, categories):
+    """
+    Positions of each flag value found from the integer codes of the flags.
+    The rows are counted for each code and grouped with a stable sort of the
+    codes, which is a radix sort for small integer codes, so the flag strings
+    are never compared. The returned arrays are read-only so they can be
+    shared by the index getters of the data classes.
+
+    Parameters
+    ----------
+    codes : ndarray
+        Integer code of the flag for every row in the data [-]
+    categories : ndarray
+        Flag value for each code [-]
+
+    Returns
+    -------
+    index : dict
+        Sorted integer positions for each flag value in the data.
+    """
+    counts = np.bincount(codes, minlength=len(categories))
+    order = np.argsort(codes, kind='stable')
+
+    index = {}
+    for value, count, ids in zip(categories, counts, np.split(order, np.cumsum(counts)[:-1])):
+        if count:
+            ids.flags.writeable = False
+            index[str(value)] = ids
+    return index
+
+
+def freeze(*arrays):
+    """
+    Make arrays read-only and return them as a tuple.
+    """
+    for arr in arrays:
+        arr.flags.writeable = False
+    return arrays
+
+
+def slice_index(index, start, stop=None):
+    """
+    Flag index for the rows from `start` up to but not including `stop` where
+    positions are shifted so `start` is zero.
+
+    Parameters
+    ----------
+    index : dict
+        Flag index from `flag_index()`.
+    start : int
+        First row of the slice.
+    stop : int, optional
+        Row after the last row of the slice. Default is `None` for the end of
+        the data.
+
+    Returns
+    -------
+    index : dict
+        Sorted integer positions for each flag value in the slice.
+    """
+    sliced = {}
+    for value, ids in index.items():
+        lo = np.searchsorted(ids, start)
+        hi = len(ids) if stop is None else np.searchsorted(ids, stop)
+        ids = ids[lo:hi] - start
+        ids.flags.writeable = False
+        sliced[value] = ids
+    return sliced
+
+
+def read_columns(path, columns, flag=None, skiprows=None, dtypes=None):
+    """
+    Read only the needed columns from a battery cycler CSV file. Numeric
+    columns are parsed with fixed dtypes and the flag column is parsed as a
+    categorical column. The pyarrow engine is used when it is installed and
+    the file has no preamble, otherwise the C engine is used.
+
+    Parameters
+    ----------
+    path : str
+        Path to the data file.
+    columns : list
+        Names of the numeric columns to read.
+    flag : str, optional
+        Name of the flag column. Default is `None` for no flag column.
+    skiprows : int, optional
+        Number of preamble lines before the column names. Default is `None`.
+    dtypes : dict, optional
+        Dtype for each numeric column. Default is float64 for every column.
+
+    Returns
+    -------
+    data : DataBlock
+        Numeric columns as one array and the flags. Each column and the flags
+        are found with `data[name]`.
+    """
+    options = ('read_columns', tuple(columns), flag, skiprows, repr(dtypes))
+    arrays = cached(path, options, lambda: _read_columns(path, columns, flag, skiprows, dtypes))
+    return DataBlock(
+        arrays['values'], columns, arrays.get('flags'), flag, arrays.get('codes'), arrays.get('categories'))
+
+
+def has_footer(path, nbytes=512):
+    """
+    Check if the last line of a CSV file is a footer without delimiters such
+    as the `Total Number of Data Lines in the Database` line at the end of
+    Bitrode exports. Only the end of the file is read.
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - nbytes, 0))
+        lines = f.read().rstrip().splitlines()
+    return bool(lines) and b',' not in lines[-1]
+
+
+def _strip_footer(df, columns, dtype):
+    """
+    Drop the footer row from data parsed without numeric dtypes, then apply
+    the numeric dtypes to the columns.
+    """
+    values = df[list(columns)].apply(pd.to_numeric, errors='coerce')
+    keep = values.notna().any(axis=1).to_numpy()
+    df = df[keep].copy()
+    for name in columns:
+        df[name] = values[name][keep].astype(dtype[name])
+    return df
+
+
+def _read_columns(path, columns, flag, skiprows, dtypes):
+    """
+    Parse the columns of a battery cycler CSV file with pandas.
+    """
+    dtype = {name: np.float64 for name in columns}
+    if dtypes is not None:
+        dtype.update(dtypes)
+
+    usecols = list(columns)
+    if flag is not None:
+        usecols.append(flag)
+        dtype[flag] = 'category'
+
+    # numeric dtypes are applied after the footer row is dropped
+    footer = has_footer(path)
+    read_dtype = dtype
+    if footer:
+        read_dtype = {name: kind for name, kind in dtype.items() if name not in columns}
+
+    engine = 'pyarrow' if HAS_PYARROW and skiprows is None and not footer else 'c'
+    df = pd.read_csv(path, skiprows=skiprows, usecols=usecols, dtype=read_dtype, engine=engine)
+    if footer:
+        df = _strip_footer(df, columns, dtype)
+
+    block = DataBlock.from_columns({name: df[name].to_numpy() for name in columns})
+    data = {'values': block.values}
+    if flag is not None:
+        codes, categories = flag_codes(df[flag])
+        data['flags'] = categories[codes]
+        data['codes'] = codes
+        data['categories'] = categories
+
+    return data
+
+
+def read_lvm(path, columns):
+    """
+    Read columns from a tab-separated LabVIEW measurement (.lvm) file that has
+    no header. The columns are returned as one C-contiguous block so each
+    column is a view of the block and the rows can be sliced without copies.
+
+    Parameters
+    ----------
+    path : str
+        Path to the data file.
+    columns : list
+        Index of each column to read.
+
+    Returns
+    -------
+    block : ndarray
+        Array with shape (n_rows, n_columns) of the columns in the order given
+        by `columns`.
+    """
+    def reader():
+        df = pd.read_csv(path, header=None, sep='\t', usecols=columns, dtype=np.float64)
+        return {'block': np.ascontiguousarray(df[list(columns)].to_numpy())}
+
+    return cached(path, ('read_lvm', tuple(columns)), reader)['block']
+
+
+def nearest_index(x, value):
+    """
+    Index of the point nearest to a value in sorted points. A binary search is
+    used instead of a scan of all the points. When two points are equally
+    near, the first point is returned which is the same as
+    `np.argmin(np.abs(value - x))`.
+
+    Parameters
+    ----------
+    x : vector
+        Points sorted in ascending order.
+    value : float
+        Value to find.
+
+    Returns
+    -------
+    idx : int
+        Index of the nearest point.
+    """
+    hi = int(np.searchsorted(x, value))
+    if hi == 0:
+        return 0
+    if hi == len(x):
+        return len(x) - 1
+    lo = hi - 1
+    if abs(value - x[lo]) <= abs(x[hi] - value):
+        return lo
+    return hi
+
+
+def iter_sections(path, columns, flag, skiprows=None, dtypes=None, chunksize=100_000, bounds=('S', 'Q')):
+    """
+    Read a battery cycler CSV file in chunks and yield one test section at a
+    time. A new section starts at every row where the flag is one of the
+    boundary flags such as `S` for start and stop events or `Q` for the end of
+    the experiment. Sections that span chunk edges are joined, so the peak
+    memory is bounded by the largest section rather than the whole file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the data file.
+    columns : list
+        Names of the numeric columns to read.
+    flag : str
+        Name of the flag column.
+    skiprows : int, optional
+        Number of preamble lines before the column names. Default is `None`.
+    dtypes : dict, optional
+        Dtype for each numeric column. Default is float64 for every column.
+    chunksize : int, optional
+        Number of rows parsed at a time. Default value is 100,000.
+    bounds : tuple, optional
+        Flags that start a new section. Default is ('S', 'Q').
+
+    Yields
+    ------
+    start : int
+        Row index in the file of the first row in the section.
+    section : dict
+        Array for each column name and the flag column. The first row of each
+        section, except the rows before the first boundary, has a boundary
+        flag.
+    """
+    dtype = {name: np.float64 for name in columns}
+    if dtypes is not None:
+        dtype.update(dtypes)
+    dtype[flag] = 'category'
+    names = list(columns) + [flag]
+
+    # numeric dtypes are applied after the footer row is dropped
+    footer = has_footer(path)
+    read_dtype = dtype
+    if footer:
+        read_dtype = {name: kind for name, kind in dtype.items() if name not in columns}
+    reader = pd.read_csv(path, skiprows=skiprows, usecols=names, dtype=read_dtype, chunksize=chunksize)
+
+    pending = {name: [] for name in names}
+    start = 0
+    row = 0
+
+    def section():
+        return {name: np.concatenate(parts) for name, parts in pending.items()}
+
+    with reader:
+        for df in reader:
+            if footer:
+                df = _strip_footer(df, columns, dtype)
+            chunk = {name: df[name].to_numpy() for name in columns}
+            chunk[flag] = flags_to_array(df[flag])
+            edges = np.flatnonzero(np.isin(chunk[flag], bounds))
+
+            k = 0
+            for edge in edges:
+                if edge > k:
+                    for name in names:
+                        pending[name].append(chunk[name][k:edge])
+                if row + edge > start:
+                    yield start, section()
+                    pending = {name: [] for name in names}
+                start = int(row + edge)
+                k = edge
+
+            for name in names:
+                pending[name].append(chunk[name][k:])
+            row += len(df)
+
+    if row > start:
+        yield start, section()
@@ -0,0 +1,190 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'ECMMODEL'
+VERSION = 1
+ALIGN = 64
+
+
+class ModelArtifact:
+    """
+    Fitted equivalent circuit model loaded from a model artifact file. The
+    artifact holds everything needed to simulate the model without the
+    original data file.
+
+    Attributes
+    ----------
+    v_pts : vector
+        Voltage points for the open circuit voltage [V]
+    z_pts : vector
+        State of charge points for the open circuit voltage [-]
+    rctau : array
+        RC parameters for each 10% SOC section.
+    q : float
+        Total capacity of the battery cell or battery module [Ah]
+    eta_chg : float
+        Coulombic efficiency for charge [-]
+    eta_dis : float
+        Coulombic efficiency for discharge [-]
+    thermal : tuple or None
+        Thermal parameters as (h_conv, a_surf, tinf, m, cp) if available.
+    meta : dict
+        Other information stored with the model such as the source file.
+
+    Methods
+    -------
+    ocv(soc)
+        Interpolate open circuit voltage at the state of charge.
+    stepper(zi, ti)
+        Create a stepper to simulate the model one time step at a time.
+    """
+
+    def __init__(self, v_pts, z_pts, rctau, q, eta_chg, eta_dis, thermal=None, meta=None):
+        self.v_pts = v_pts
+        self.z_pts = z_pts
+        self.rctau = rctau
+        self.q = q
+        self.eta_chg = eta_chg
+        self.eta_dis = eta_dis
+        self.thermal = thermal
+        self.meta = meta if meta is not None else {}
+
+    def ocv(self, soc):
+        """
+        Linearly interpolate the open circuit voltage from the state of charge
+        points and voltage points.
+        """
+        return np.interp(soc, self.z_pts[::-1], self.v_pts[::-1])
+
+    def stepper(self, zi=1.0, ti=298.15):
+        """
+        Create an `EcmStepper` for the model at the initial state of charge
+        and temperature.
+        """
+        from .ecm_stepper import EcmStepper
+        return EcmStepper(
+            self.rctau, self.v_pts, self.z_pts, self.q, self.eta_chg, self.eta_dis,
+            zi=zi, ti=ti, thermal=self.thermal)
+
+
+def save_model(path, ecm, v_pts, z_pts, rctau, meta=None):
+    """
+    Save a fitted cell or module model to a versioned binary artifact file.
+
+    The file starts with the 8-byte magic `ECMMODEL`, a little-endian uint32
+    format version, and a uint32 header length. A JSON header follows with the
+    scalar parameters and the dtype, shape, and offset of each array. The
+    arrays are stored as raw little-endian data aligned to 64 bytes so they
+    can be memory-mapped.
+
+    Parameters
+    ----------
+    path : str
+        Path to the artifact file.
+    ecm : CellEcm or ModuleEcm
+        Equivalent circuit model with capacity and coulombic efficiency.
+    v_pts : vector
+        Voltage points for the open circuit voltage [V]
+    z_pts : vector
+        State of charge points for the open circuit voltage [-]
+    rctau : array
+        RC parameters for each 10% SOC section.
+    meta : dict, optional
+        Other information to store with the model. Values must be JSON
+        serializable.
+    """
+    q = getattr(ecm, 'q_cell', None) or getattr(ecm, 'q_module')
+
+    arrays = {
+        'v_pts': np.ascontiguousarray(v_pts, dtype='<f8'),
+        'z_pts': np.ascontiguousarray(z_pts, dtype='<f8'),
+        'rctau': np.ascontiguousarray(rctau, dtype='<f8'),
+    }
+
+    if hasattr(ecm, 'm_module'):
+        arrays['thermal'] = np.array(
+            [ecm.h_conv, ecm.a_surf, ecm.tinf, ecm.m_module, ecm.cp_module], dtype='<f8')
+
+    scalars = {
+        'kind': type(ecm).__name__,
+        'q': float(q),
+        'eta_chg': float(ecm.eta_chg),
+        'eta_dis': float(ecm.eta_dis),
+    }
+
+    # offsets are relative to the start of the data section
+    specs = {}
+    offset = 0
+    for name, arr in arrays.items():
+        specs[name] = {'dtype': arr.dtype.str, 'shape': list(arr.shape), 'offset': offset}
+        offset += -(-arr.nbytes // ALIGN) * ALIGN
+
+    header = json.dumps({'scalars': scalars, 'arrays': specs, 'meta': meta or {}}).encode()
+    start = len(MAGIC) + 8 + len(header)
+    pad = -start % ALIGN
+
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<II', VERSION, len(header) + pad))
+        f.write(header + b' ' * pad)
+        for name, arr in arrays.items():
+            f.write(arr.tobytes())
+            f.write(b'\0' * (-arr.nbytes % ALIGN))
+    os.replace(tmp, path)
+
+
+def load_model(path, mmap=True):
+    """
+    Load a fitted model from an artifact file written by `save_model()`.
+
+    Parameters
+    ----------
+    path : str
+        Path to the artifact file.
+    mmap : bool, optional
+        Memory-map the arrays instead of reading them into memory. Default
+        value is `True`.
+
+    Returns
+    -------
+    model : ModelArtifact
+        Fitted model with OCV points, RC parameters, and battery parameters.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not an ECM model artifact')
+
+        version, nheader = struct.unpack('<II', f.read(8))
+        if version > VERSION:
+            raise ValueError(f'model artifact version {version} is newer than supported version {VERSION}')
+
+        header = json.loads(f.read(nheader))
+        start = len(MAGIC) + 8 + nheader
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            shape = tuple(spec['shape'])
+            offset = start + spec['offset']
+            if mmap:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+            else:
+                f.seek(offset)
+                count = int(np.prod(shape))
+                arrays[name] = np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+
+    scalars = header['scalars']
+    thermal = arrays.get('thermal')
+    if thermal is not None:
+        thermal = tuple(float(x) for x in thermal)
+
+    meta = dict(header.get('meta', {}), kind=scalars['kind'], version=version)
+
+    return ModelArtifact(
+        arrays['v_pts'], arrays['z_pts'], arrays['rctau'], scalars['q'],
+        scalars['eta_chg'], scalars['eta_dis'], thermal=thermal, meta=meta)
@@ -1,5 +1,7 @@
 import numpy as np
-from scipy.optimize import curve_fit
+
+from .fitting import fit_sections, jac_otc, jac_ttc
+from .kernels import linear_recurrence, soc_coulomb, soc_index, temperature_lumped
 
 
 class ModuleEcm:
@@ -75,22 +77,26 @@ class ModuleEcm:
         """
         return a - b * np.exp(-alpha * t) - c * np.exp(-beta * t)
 
+    # Jacobians of the exponential functions are defined once in the fitting module
+    jac_otc = staticmethod(jac_otc)
+    jac_ttc = staticmethod(jac_ttc)
+
     @staticmethod
     def get_rtau(rctau, z):
         """
-        Determine tau and resistor values for any SOC.
+        Determine tau and resistor values for any SOC. The SOC can be a single
+        value or a vector of values such as an entire SOC profile.
         """
 
         # determine index where z is close to soc parameters
-        soc = np.arange(0.1, 1.0, 0.1)[::-1]
-        idx = abs(soc - z).argmin()
+        idx = soc_index(z)
 
         # return resistor and tau values at z
-        tau1 = rctau[:, 0][idx]
-        tau2 = rctau[:, 1][idx]
-        r0 = rctau[:, 2][idx]
-        r1 = rctau[:, 3][idx]
-        r2 = rctau[:, 4][idx]
+        tau1 = rctau[idx, 0]
+        tau2 = rctau[idx, 1]
+        r0 = rctau[idx, 2]
+        r1 = rctau[idx, 3]
+        r2 = rctau[idx, 4]
         return tau1, tau2, r0, r1, r2
 
     def soc(self):
@@ -122,21 +128,7 @@ class ModuleEcm:
         .. [#plett] Plett, Gregory L. Battery Management Systems, Volume I: Battery
            Modeling. Vol. 2. Artech House, 2015.
         """
-        current = self.current
-        time = self.time
-
-        q = self.q_module * 3600    # convert from Ah to As
-        dt = np.diff(time)          # time steps in seconds
-        z = np.ones(len(current))   # initialize state of charge array
-
-        # determine state of charge at each time step
-        for k, i in enumerate(current[1:]):
-            if i > 0:
-                eta = self.eta_chg
-            else:
-                eta = self.eta_dis
-            z[k + 1] = z[k] + ((eta * i * dt[k]) / q)
-
+        z = soc_coulomb(self.current, self.time, self.q_module, self.eta_chg, self.eta_dis)
         return z
 
     def ocv(self, soc, pts=False, vz_pts=None):
@@ -187,7 +179,8 @@ class ModuleEcm:
             ocv = np.interp(soc, z_pts[::-1], v_pts[::-1])
             return ocv
 
-    def curve_fit_coeff(self, func, ncoeff):
+    def curve_fit_coeff(self, func, ncoeff, executor=None, n_jobs=None, jac=None, warm_start=False,
+                        nfev=False, method='curve_fit'):
         """
         Determine curve fit coefficients for each 10% change in SOC from HPPC
         data. These coefficients are used to calculate the RC parameters.
@@ -198,11 +191,38 @@ class ModuleEcm:
             Exponential function defining the curve.
         ncoeff : int
             Number of coefficients in the exponential function.
+        executor : Executor, optional
+            Thread or process pool from `concurrent.futures` used to fit the
+            SOC sections at the same time. Default is `None`.
+        n_jobs : int, optional
+            Number of processes used to fit the SOC sections when an executor
+            is not given. Use -1 for the number of processors. Default is
+            `None` where the sections are fit one after another.
+        jac : function, optional
+            Jacobian of the exponential function such as `jac_otc` or
+            `jac_ttc`. Default is `None` where the Jacobian is estimated with
+            finite differences.
+        warm_start : bool, optional
+            Seed each SOC section with the converged coefficients of the
+            previous SOC section. Sections are fit one after another. Default
+            value is `False`.
+        nfev : bool, optional
+            Return the number of function evaluations for each SOC section.
+            Default value is `False`.
+        method : str, optional
+            Use 'curve_fit' to fit all coefficients with nonlinear least
+            squares or 'varpro' for a variable projection fit where the linear
+            coefficients of `func_otc` or `func_ttc` are solved in closed form
+            and only the rates are searched. The variable projection fit is
+            more robust to the initial guess but slower. Default value is
+            'curve_fit'.
 
         Returns
         -------
         coeff : array
             Coefficients at each 10% change in SOC.
+        nfev : vector, optional
+            Number of function evaluations for each 10% change in SOC.
         """
 
         # index points for curve fit, id2 and id4 must be same length
@@ -211,6 +231,7 @@ class ModuleEcm:
 
         nrow = len(id2)
         coeff = np.zeros((nrow, ncoeff))
+        sections = []
 
         for i in range(nrow):
             start = id2[i]
@@ -222,9 +243,18 @@ class ModuleEcm:
                 guess = v_curve[-1], 0.0644, 0.0012
             elif ncoeff == 5:
                 guess = v_curve[-1], 0.0724, 0.0575, 0.0223, 0.0007
-            popt, pcov = curve_fit(func, t_curve, v_curve, p0=guess, maxfev=3000)
-            coeff[i] = popt
+            sections.append((t_curve, v_curve, guess))
+
+        kwargs = {'maxfev': 3000}
+        if jac is not None:
+            kwargs['jac'] = jac
 
+        popts, nfevs = fit_sections(
+            func, sections, kwargs, executor=executor, n_jobs=n_jobs, warm_start=warm_start, method=method)
+        coeff[:] = popts
+
+        if nfev:
+            return coeff, np.array(nfevs)
         return coeff
 
     def rctau_ttc(self, coeff):
@@ -295,24 +325,22 @@ class ModuleEcm:
         v1 = np.zeros(nc)           # initialize v1 array
         v2 = np.zeros(nc)           # initialize v2 array
 
-        for k in range(1, nc):
-            i = self.current[k]
-
-            # get parameters at state of charge
-            tau1, tau2, r0, r1, r2 = self.get_rtau(rctau, soc[k])
+        # get parameters at state of charge for all time steps
+        i = self.current[1:]
+        tau1, tau2, r0, r1, r2 = self.get_rtau(rctau, soc[1:])
 
-            # voltage in r0 resistor
-            v0[k] = r0 * i
+        # voltage in r0 resistor
+        v0[1:] = r0 * i
 
-            # voltage in c1 capacitor
-            tm1 = v1[k - 1] * np.exp(-dt[k - 1] / tau1)
-            tm2 = r1 * (1 - np.exp(-dt[k - 1] / tau1)) * i
-            v1[k] = tm1 + tm2
+        # decay and input terms for voltage in c1 and c2 capacitors
+        a1 = np.exp(-dt / tau1)
+        b1 = r1 * (1 - a1) * i
+        a2 = np.exp(-dt / tau2)
+        b2 = r2 * (1 - a2) * i
 
-            # voltage in c2 capacitor
-            tm3 = v2[k - 1] * np.exp(-dt[k - 1] / tau2)
-            tm4 = r2 * (1 - np.exp(-dt[k - 1] / tau2)) * i
-            v2[k] = tm3 + tm4
+        # voltage in c1 and c2 capacitors as first-order linear recurrences
+        v1[1:] = linear_recurrence(a1, b1)
+        v2[1:] = linear_recurrence(a2, b2)
 
         vt = ocv + v0 + v1 + v2
         return vt
@@ -321,17 +349,7 @@ class ModuleEcm:
         """
         Calculate temperature of the battery module.
         """
-        dt = np.diff(self.time)
-        nc = len(self.current)
-
-        temps = np.zeros(nc)
-        temps[0] = ti
-
-        for k in range(nc - 1):
-            i = self.current[k]
-            q_irrev = i * (vt[k] - ocv[k])
-            q_conv = self.h_conv * self.a_surf * (self.tinf - temps[k])
-            q = q_irrev + q_conv
-            temps[k + 1] = temps[k] + (q / (self.m_module * self.cp_module)) * dt[k]
-
+        _, temps = temperature_lumped(
+            self.current, self.time, ocv, vt, ti,
+            self.h_conv, self.a_surf, self.tinf, self.m_module, self.cp_module)
         return temps
@@ -1,5 +1,6 @@
 import numpy as np
-import pandas as pd
+
+from .loaders import EMPTY_INDEX, flag_index, freeze, read_columns, slice_index
 
 
 class ModuleHppcData:
@@ -7,6 +8,8 @@ class ModuleHppcData:
     Data from HPPC battery module test.
     """
 
+    __slots__ = ('block', 'time', 'current', 'voltage', 'temp_a1', 'flags', '_index', '_discharge')
+
     def __init__(self, path, all_data=False):
         """
         Initialize with path to HPPC battery module data file.
@@ -32,32 +35,35 @@ class ModuleHppcData:
             Temperature from HPPC battery module test data [°C]
         flags : vector
             Flags for start and stop events in the HPPC battery module data [-]
+        block : DataBlock
+            Data for all the channels where `current`, `voltage`, `temp_a1`,
+            and `flags` are views of the block.
         """
-        df = pd.read_csv(path, skiprows=20)
+        columns = ['Total Time', 'Current', 'Voltage', 'Temperature A1']
+        block = read_columns(path, columns, flag='Data Acquisition Flag', skiprows=20)
+        index = flag_index(block.codes, block.categories)
 
         if all_data:
-            self.time = df['Total Time'].values
-            self.current = df['Current'].values
-            self.voltage = df['Voltage'].values
-            self.temp_a1 = df['Temperature A1'].values
-            self.flags = df['Data Acquisition Flag'].values
+            self.time = block['Total Time']
         else:
-            time = df['Total Time'].values
-            current = df['Current'].values
-            voltage = df['Voltage'].values
-            temp_a1 = df['Temperature A1'].values
-            flags = df['Data Acquisition Flag'].values
-
-            ids = np.where(flags == 'S')[0]
+            ids = index['S']
             start = ids[21]     # index for start of hppc data
             end = ids[76]       # index for end of hppc data
 
             # scale time vector to begin at 0, this helps when calculating curve fit coefficients
-            self.time = time[start:end + 1] - time[start]
-            self.current = current[start:end + 1]
-            self.voltage = voltage[start:end + 1]
-            self.temp_a1 = temp_a1[start:end + 1]
-            self.flags = flags[start:end + 1]
+            block = block.window(start, end + 1)
+            index = slice_index(index, start, end + 1)
+            self.time = block['Total Time'] - block['Total Time'][0]
+
+        self.block = block
+        self.current = block['Current']
+        self.voltage = block['Voltage']
+        self.temp_a1 = block['Temperature A1']
+        self.flags = block['Data Acquisition Flag']
+
+        # flags are scanned once when loaded and section indices are kept after first use
+        self._index = index
+        self._discharge = None
 
     def get_indices_s(self):
         """
@@ -69,7 +75,7 @@ class ModuleHppcData:
         ids : vector
             Indices of start and stop points in data.
         """
-        ids = np.where(self.flags == 'S')[0]
+        ids = self._index.get('S', EMPTY_INDEX)
         return ids
 
     def get_indices_discharge(self):
@@ -91,11 +97,19 @@ class ModuleHppcData:
         id4 : ndarray
             Indices at end of constant discharge rest period for each 10% SOC section.
         """
-        ids = self.get_indices_s()
+        if self._discharge is None:
+            self._discharge = self._find_discharge(self.get_indices_s())
+        return self._discharge
+
+    @staticmethod
+    def _find_discharge(ids):
+        """
+        Constant discharge section indices from the indices of the `S` flag.
+        """
         id0 = ids[0::6]
         id1 = id0 + 1
         id2 = ids[1::6]
         id3 = np.delete(id2, -1)
         id3 = id3 + 1
         id4 = ids[2::6]
-        return id0, id1, id2, id3, id4
+        return freeze(id0, id1, id2, id3, id4)
@@ -0,0 +1,431 @@
+import numpy as np
+
+from .kernels import pack_coupled, soc_coulomb, soc_index, temperature_cells, vt_cells
+
+
+class PackEcm:
+    """
+    Equivalent circuit model (ECM) for a battery pack where cells are
+    connected in parallel to make a module and the modules are connected in
+    series to make a pack. Every cell has its own capacity, RC parameters,
+    and initial state of charge. The current split and the state of charge,
+    voltage, and temperature of all cells are calculated together as arrays
+    with shape (n_series, n_parallel, n_steps). The current split is either
+    fixed from the initial state of the cells or coupled to the state of
+    every cell at each time step.
+
+             |== Cell ==|     |== Cell ==|
+    Pack  ---|== Cell ==|--*--|== Cell ==|---
+             |== Cell ==|     |== Cell ==|
+
+    Parameters
+    ----------
+    n_series : int
+        Number of modules in series.
+    n_parallel : int
+        Number of cells in parallel in each module.
+    rctau : array
+        RC parameters shared by all cells with shape (n_rows, 7) or RC
+        parameters for each cell with shape (n_series, n_parallel, n_rows, 7).
+    v_pts : vector
+        Open circuit voltage points from `ocv(soc, pts=True)` [V]
+    z_pts : vector
+        State of charge points from `ocv(soc, pts=True)` [-]
+    q : float or array
+        Total capacity of each cell [Ah]
+    eta_chg : float
+        Coulombic efficiency for charge [-]
+    eta_dis : float
+        Coulombic efficiency for discharge [-]
+    zi : float or array, optional
+        Initial state of charge of each cell [-]. Default value is 1.0.
+    r0 : float or array, optional
+        Resistance of each cell used to split the module current [Ω]. Default
+        is the mean `r0` of the SOC sections in the RC parameters of the cell.
+    thermal : tuple, optional
+        Thermal parameters of a cell given as (h_conv, a_surf, tinf, m, cp).
+        Default is `None` where the temperature is held constant.
+    ti : float or array, optional
+        Initial temperature of each cell [K]. Default value is 298.15.
+
+    Methods
+    -------
+    from_ecm(ecm, n_series, n_parallel, rctau, v_pts, z_pts)
+        Create pack model from a fitted cell ECM.
+    ocv(soc)
+        Interpolate open circuit voltage at the state of charge.
+    current_split(i_pack)
+        Split pack current into the current of each cell.
+    simulate(i_pack, time, coupled, dedupe)
+        Current, SOC, OCV, voltage, and temperature of every cell.
+    simulate_topology(i_pack, time, topology)
+        Pack voltage and state of every cell for a pack network.
+    v_pack(vt)
+        Pack voltage from the voltage of every cell.
+    """
+
+    def __init__(self, n_series, n_parallel, rctau, v_pts, z_pts, q, eta_chg, eta_dis,
+                 zi=1.0, r0=None, thermal=None, ti=298.15):
+        """
+        Initialize with pack topology, cell parameters, and initial state.
+        """
+        shape = (n_series, n_parallel)
+        self.n_series = n_series
+        self.n_parallel = n_parallel
+        self.rctau = np.asarray(rctau, dtype=float)
+        self.v_pts = np.asarray(v_pts, dtype=float)
+        self.z_pts = np.asarray(z_pts, dtype=float)
+        self.q = np.broadcast_to(np.asarray(q, dtype=float), shape)
+        self.eta_chg = eta_chg
+        self.eta_dis = eta_dis
+        self.zi = np.broadcast_to(np.asarray(zi, dtype=float), shape)
+        self.thermal = thermal
+        self.ti = np.broadcast_to(np.asarray(ti, dtype=float), shape)
+
+        if r0 is None:
+            r0 = self.rctau[..., 2].mean(axis=-1)
+        self.r0 = np.broadcast_to(np.asarray(r0, dtype=float), shape)
+
+    @classmethod
+    def from_ecm(cls, ecm, n_series, n_parallel, rctau, v_pts, z_pts, zi=1.0, q=None, tm=None, ti=298.15):
+        """
+        Create a pack model from a fitted `CellEcm`.
+
+        Parameters
+        ----------
+        ecm : CellEcm
+            Equivalent circuit model with capacity and coulombic efficiency.
+        n_series : int
+            Number of modules in series.
+        n_parallel : int
+            Number of cells in parallel in each module.
+        rctau : array
+            RC parameters for each 10% SOC section.
+        v_pts : vector
+            Open circuit voltage points [V]
+        z_pts : vector
+            State of charge points [-]
+        zi : float or array, optional
+            Initial state of charge of each cell [-]. Default value is 1.0.
+        q : float or array, optional
+            Total capacity of each cell [Ah]. Default is `q_cell` of the ECM.
+        tm : ThermalModel, optional
+            Thermal model for the battery cell. Default is `None` where the
+            temperature is held constant.
+        ti : float or array, optional
+            Initial temperature of each cell [K]. Default value is 298.15.
+
+        Returns
+        -------
+        pack : PackEcm
+            Pack model where every cell starts from the ECM parameters.
+        """
+        if q is None:
+            q = ecm.q_cell
+
+        thermal = None if tm is None else (tm.h, tm.sa, tm.tf, tm.m, tm.cp)
+
+        return cls(
+            n_series, n_parallel, rctau, v_pts, z_pts, q, ecm.eta_chg, ecm.eta_dis,
+            zi=zi, thermal=thermal, ti=ti)
+
+    @property
+    def n_cells(self):
+        return self.n_series * self.n_parallel
+
+    def ocv(self, soc):
+        """
+        Linearly interpolate the open circuit voltage from the state of charge
+        points and voltage points.
+        """
+        return np.interp(soc, self.z_pts[::-1], self.v_pts[::-1])
+
+    def current_split(self, i_pack):
+        """
+        Split the pack current into the current of each cell. The cells in a
+        module share the module voltage so each cell current is
+        (v_module - ocv) / r0 where the cell currents sum to the pack current.
+        This is the same sign convention as vt = ocv + r0 * i of the cell
+        model where discharge current is negative, so a cell with a higher
+        OCV carries more discharge current. The split uses the OCV at the
+        initial state of charge and `r0` of each cell, so the current of each
+        cell is linear in the pack current.
+
+        Note
+        ----
+        The balancing term g * (v_module - ocv) has the opposite sign of the
+        (ocv - v_module) / r0 split used by earlier versions of the
+        cell-to-pack examples. Compared with plots from those examples, the
+        balancing currents between cells in a module change direction.
+
+        Parameters
+        ----------
+        i_pack : vector
+            Current applied to the pack at every time step [A]
+
+        Returns
+        -------
+        i_cells : array
+            Current of each cell, shape is (n_series, n_parallel, n_steps) [A]
+        """
+        i_pack = np.asarray(i_pack, dtype=float)
+        offset, gain = self._split_terms()
+        i_cells = offset[..., np.newaxis] + gain[..., np.newaxis] * i_pack
+        return i_cells
+
+    def _split_terms(self):
+        """
+        Offset [A] and gain [-] of each cell for the split of the pack current
+        as i_cell = offset + gain * i_pack.
+        """
+        ocv = self.ocv(self.zi)
+        g = 1 / self.r0
+        g_module = g.sum(axis=1, keepdims=True)
+
+        # i_cell = g * (v_module - ocv) with v_module = (i_pack + sum(g * ocv)) / sum(g)
+        offset = g * ((g * ocv).sum(axis=1, keepdims=True) / g_module - ocv)
+        gain = g / g_module
+        return offset, gain
+
+    def _rctau_cells(self):
+        """
+        RC parameters shared by all cells or stacked for each cell as
+        (n_cells, n_rows, 7).
+        """
+        if self.rctau.ndim == 2:
+            return self.rctau
+        return self.rctau.reshape(self.n_cells, *self.rctau.shape[2:])
+
+    def _cell_classes(self, *terms):
+        """
+        Group cells with the same initial state, parameters, and other terms
+        of each cell into classes. Returns the first cell of each class and
+        the class of every cell.
+        """
+        columns = [self.zi.ravel(), self.q.ravel(), self.ti.ravel()]
+        columns += [np.ravel(term) for term in terms]
+        if self.rctau.ndim > 2:
+            columns.append(self.rctau.reshape(self.n_cells, -1))
+        keys = np.column_stack(columns)
+        _, index, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        return index, inverse.ravel()
+
+    def _module_classes(self):
+        """
+        Reduced rows for the coupled split where identical modules are solved
+        once and identical cells in a module are one row with a weight equal
+        to the number of cells. Returns the cell for each row, the first row
+        of each module, the weight of each row, and the row of every cell.
+        """
+        index, classes = self._cell_classes()
+        n_classes = len(index)
+        classes = classes.reshape(self.n_series, self.n_parallel)
+
+        # modules with the same cell classes in any order see the same current
+        modules, module_of = np.unique(np.sort(classes, axis=1), axis=0, return_inverse=True)
+
+        cells, starts, weights, keys = [], [0], [], []
+        for m, module in enumerate(modules):
+            module_classes, counts = np.unique(module, return_counts=True)
+            cells.append(index[module_classes])
+            starts.append(starts[-1] + len(module_classes))
+            weights.append(counts)
+            keys.append(m * n_classes + module_classes)
+
+        # keys of the rows are sorted so every cell finds its row by search
+        cell_keys = module_of.reshape(-1, 1) * n_classes + classes
+        rows = np.searchsorted(np.concatenate(keys), cell_keys.ravel())
+        return np.concatenate(cells), np.array(starts), np.concatenate(weights).astype(float), rows
+
+    def simulate(self, i_pack, time, coupled=True, dedupe=True):
+        """
+        Simulate every cell in the pack for the pack current.
+
+        Parameters
+        ----------
+        i_pack : vector
+            Current applied to the pack at every time step [A]
+        time : vector
+            Time at every time step [s]
+        coupled : bool, optional
+            Update the current split at every time step from the OCV and RC
+            branch voltages of each cell. Default value is `True`. Use
+            `False` for the split from `current_split()` at every time step.
+            The fixed split holds the balancing currents from the initial OCV
+            of the cells for the whole profile, so the SOC of mismatched cells
+            diverges instead of equalizing. It is only valid for short
+            profiles or cells with matched initial state and parameters.
+        dedupe : bool, optional
+            Simulate each class of identical cells once and copy the results
+            to every cell of the class. Cells are identical when they have
+            the same initial state, parameters, and current split. Default
+            value is `True`.
+
+        Returns
+        -------
+        i_cells : array
+            Current of each cell [A]
+        soc : array
+            State of charge of each cell [-]
+        ocv : array
+            Open circuit voltage of each cell [V]
+        vt : array
+            Terminal voltage of each cell [V]
+        temps : array
+            Temperature of each cell [K]
+
+        Note
+        ----
+        Every array has shape (n_series, n_parallel, n_steps).
+        """
+        i_pack = np.asarray(i_pack, dtype=float)
+        n_steps = len(i_pack)
+        shape = (self.n_series, self.n_parallel, n_steps)
+        rctau = np.broadcast_to(self._rctau_cells(), (self.n_cells, *self.rctau.shape[-2:]))
+
+        # each row in the calculations is one cell or one class of identical cells
+        if coupled:
+            if dedupe:
+                cells, starts, weights, rows = self._module_classes()
+            else:
+                cells = np.arange(self.n_cells)
+                starts = np.arange(0, self.n_cells + 1, self.n_parallel)
+                weights = rows = None
+            i_rows, soc, vt = pack_coupled(
+                i_pack, time, self.zi.ravel()[cells], self.q.ravel()[cells], self.eta_chg, self.eta_dis,
+                rctau[cells], self.v_pts, self.z_pts, starts, weights)
+            ocv = self.ocv(soc)
+        else:
+            offset, gain = self._split_terms()
+            if dedupe:
+                cells, rows = self._cell_classes(offset, gain)
+            else:
+                cells = np.arange(self.n_cells)
+                rows = None
+            i_rows = offset.ravel()[cells, np.newaxis] + gain.ravel()[cells, np.newaxis] * i_pack
+            soc = soc_coulomb(
+                i_rows, time, self.q.ravel()[cells], self.eta_chg, self.eta_dis, zi=self.zi.ravel()[cells])
+            ocv = self.ocv(soc)
+            rct = self.rctau if self.rctau.ndim == 2 else rctau[cells]
+            vt = vt_cells(i_rows, time, soc, ocv, rct)
+
+        ti = self.ti.ravel()[cells]
+        if self.thermal is None:
+            temps = np.repeat(ti.reshape(-1, 1), n_steps, axis=1)
+        else:
+            _, temps = temperature_cells(i_rows, time, ocv, vt, ti, *self.thermal)
+
+        results = (i_rows, soc, ocv, vt, temps)
+        if rows is not None:
+            results = tuple(x[rows] for x in results)
+        return tuple(x.reshape(shape) for x in results)
+
+    def simulate_topology(self, i_pack, time, topology):
+        """
+        Simulate every cell in a pack network with busbar and interconnect
+        resistances. At each time step every cell is a source
+        ocv + a1 * v1 + a2 * v2 in series with the resistance
+        r0 + r1 * (1 - a1) + r2 * (1 - a2) and the node voltages are found
+        with a sparse nodal analysis solve. The factorization of the network
+        is reused until the SOC section or time step of a cell changes.
+
+        Parameters
+        ----------
+        i_pack : vector
+            Current applied to the pack at every time step [A]
+        time : vector
+            Time at every time step [s]
+        topology : PackTopology
+            Network of the pack. Cells of the network are the cells of this
+            model in row-major order of (n_series, n_parallel).
+
+        Returns
+        -------
+        v_pack : vector
+            Voltage at the pack terminals [V]
+        i_cells : array
+            Current of each cell [A]
+        soc : array
+            State of charge of each cell [-]
+        ocv : array
+            Open circuit voltage of each cell [V]
+        vt : array
+            Terminal voltage of each cell [V]
+        temps : array
+            Temperature of each cell [K]
+
+        Note
+        ----
+        Cell arrays have shape (n_cells, n_steps). The OCV and RC parameters
+        for a time step are taken at the state of charge of the previous time
+        step.
+        """
+        if topology.n_cells != self.n_cells:
+            raise ValueError(f'topology has {topology.n_cells} cells but the pack has {self.n_cells} cells')
+
+        i_pack = np.asarray(i_pack, dtype=float)
+        n_cells = self.n_cells
+        n_steps = len(i_pack)
+        dt = np.diff(time)
+        rctau = np.broadcast_to(self._rctau_cells(), (n_cells, *self.rctau.shape[-2:]))
+        cells = np.arange(n_cells)
+        q = self.q.ravel() * 3600
+
+        v_pack = np.empty(n_steps)
+        i_cells = np.empty((n_cells, n_steps))
+        soc = np.empty((n_cells, n_steps))
+        vt = np.empty((n_cells, n_steps))
+
+        zk = self.zi.ravel().copy()
+        v1 = np.zeros(n_cells)
+        v2 = np.zeros(n_cells)
+
+        for k in range(n_steps):
+            h = dt[k - 1] if k > 0 else 0.0
+
+            # source voltage and conductance of each cell for the time step
+            p = rctau[cells, soc_index(zk)]
+            a1 = np.exp(-h / p[:, 0])
+            a2 = np.exp(-h / p[:, 1])
+            e = self.ocv(zk) + a1 * v1 + a2 * v2
+            g = 1 / (p[:, 2] + p[:, 3] * (1 - a1) + p[:, 4] * (1 - a2))
+
+            vk, ik, v_pack[k] = topology.solve(g, e, i_pack[k])
+            i_cells[:, k] = ik
+            vt[:, k] = vk
+
+            if k > 0:
+                v1 = a1 * v1 + p[:, 3] * (1 - a1) * ik
+                v2 = a2 * v2 + p[:, 4] * (1 - a2) * ik
+                eta = np.where(ik > 0, self.eta_chg, self.eta_dis)
+                zk = zk + (eta * ik * h) / q
+            soc[:, k] = zk
+
+        ocv = self.ocv(soc)
+
+        if self.thermal is None:
+            temps = np.repeat(self.ti.reshape(-1, 1), n_steps, axis=1)
+        else:
+            _, temps = temperature_cells(i_cells, time, ocv, vt, self.ti.ravel(), *self.thermal)
+
+        return v_pack, i_cells, soc, ocv, vt, temps
+
+    @staticmethod
+    def v_pack(vt):
+        """
+        Pack voltage from the terminal voltage of each cell. The module
+        voltage is the mean voltage of the cells in parallel and the pack
+        voltage is the sum of the module voltages.
+
+        Parameters
+        ----------
+        vt : array
+            Terminal voltage of each cell, shape is (n_series, n_parallel,
+            n_steps) [V]
+
+        Returns
+        -------
+        v_pack : vector
+            Pack voltage at every time step [V]
+        """
+        return vt.mean(axis=1).sum(axis=0)
@@ -0,0 +1,211 @@
+"""
+Monte Carlo ensemble of battery packs where the initial state of charge,
+capacity, and series resistance of every cell are randomized.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .pack_ecm import PackEcm
+
+METRICS = ('v_pack_min', 'v_pack_end', 'soc_min_end', 'soc_spread_end', 'i_cell_max', 'temp_max')
+
+
+def _stats_new(shape=()):
+    """
+    Empty running statistics as [count, mean, m2, min, max].
+    """
+    return [0, np.zeros(shape), np.zeros(shape), np.full(shape, np.inf), np.full(shape, -np.inf)]
+
+
+def _stats_update(stats, x):
+    """
+    Add one sample to running statistics with Welford's algorithm.
+    """
+    stats[0] += 1
+    delta = x - stats[1]
+    stats[1] = stats[1] + delta / stats[0]
+    stats[2] = stats[2] + delta * (x - stats[1])
+    stats[3] = np.minimum(stats[3], x)
+    stats[4] = np.maximum(stats[4], x)
+
+
+def _stats_merge(a, b):
+    """
+    Combine running statistics from two sets of samples.
+    """
+    n = a[0] + b[0]
+    if a[0] == 0 or b[0] == 0:
+        return b if a[0] == 0 else a
+    delta = b[1] - a[1]
+    mean = a[1] + delta * (b[0] / n)
+    m2 = a[2] + b[2] + delta**2 * (a[0] * b[0] / n)
+    return [n, mean, m2, np.minimum(a[3], b[3]), np.maximum(a[4], b[4])]
+
+
+def _stats_summary(stats):
+    """
+    Mean, standard deviation, min, and max from running statistics.
+    """
+    n, mean, m2, lo, hi = stats
+    std = np.sqrt(m2 / (n - 1)) if n > 1 else np.zeros_like(mean)
+    return {'mean': mean, 'std': std, 'min': lo, 'max': hi}
+
+
+def _sample_pack(pack, rng, zi, q, r0):
+    """
+    Copy of the pack where the initial SOC and capacity of each cell are
+    drawn from uniform distributions and `r0` of each cell is scaled by a
+    uniform factor.
+    """
+    shape = (pack.n_series, pack.n_parallel)
+    zi_cells = rng.uniform(*zi, shape) if zi is not None else pack.zi
+    q_cells = rng.uniform(*q, shape) if q is not None else pack.q
+
+    rctau = np.broadcast_to(pack.rctau, shape + pack.rctau.shape[-2:]).copy()
+    r0_cells = pack.r0
+    if r0 is not None:
+        scale = rng.uniform(*r0, shape)
+        rctau[..., 2] *= scale[..., np.newaxis]
+        r0_cells = pack.r0 * scale
+
+    return PackEcm(
+        pack.n_series, pack.n_parallel, rctau, pack.v_pts, pack.z_pts, q_cells,
+        pack.eta_chg, pack.eta_dis, zi=zi_cells, r0=r0_cells, thermal=pack.thermal, ti=pack.ti)
+
+
+def _run_samples(pack, i_pack, time, n, seed, zi, q, r0, coupled):
+    """
+    Simulate `n` random packs and return running statistics of the metrics
+    and of the pack voltage at every time step.
+    """
+    rng = np.random.default_rng(seed)
+    metrics = {name: _stats_new() for name in METRICS}
+    trace = _stats_new(len(time))
+
+    for _ in range(n):
+        sample = _sample_pack(pack, rng, zi, q, r0)
+        i_cells, soc, _, vt, temps = sample.simulate(i_pack, time, coupled=coupled)
+        v_pack = sample.v_pack(vt)
+
+        values = {
+            'v_pack_min': v_pack.min(),
+            'v_pack_end': v_pack[-1],
+            'soc_min_end': soc[..., -1].min(),
+            'soc_spread_end': np.ptp(soc[..., -1]),
+            'i_cell_max': np.abs(i_cells).max(),
+            'temp_max': temps.max(),
+        }
+        for name, value in values.items():
+            _stats_update(metrics[name], value)
+        _stats_update(trace, v_pack)
+
+    return metrics, trace
+
+
+def _run_shared(shm_name, n_steps, pack, n, seed, zi, q, r0, coupled):
+    """
+    Worker that reads the current and time of the drive cycle from shared
+    memory without copying them.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    cycle = np.ndarray((2, n_steps), dtype=np.float64, buffer=shm.buf)
+    try:
+        return _run_samples(pack, cycle[0], cycle[1], n, seed, zi, q, r0, coupled)
+    finally:
+        # views of the buffer are released before it is closed
+        del cycle
+        shm.close()
+
+
+def run_ensemble(pack, i_pack, time, n_samples, zi=(0.95, 1.0), q=None, r0=None,
+                 seed=None, n_jobs=None, chunk_size=16, coupled=True):
+    """
+    Simulate an ensemble of packs with random variation between cells and
+    return summary statistics of the pack performance. The samples are split
+    into chunks that are simulated on a process pool. Each chunk has its own
+    random stream spawned from `seed`, so the results only depend on the seed
+    and chunk size and not on the number of processes. The drive cycle is
+    shared with the processes through shared memory and only running
+    statistics are returned from each process.
+
+    Parameters
+    ----------
+    pack : PackEcm
+        Nominal pack model. Thermal parameters and initial temperature are
+        used for every sample.
+    i_pack : vector
+        Current applied to the pack at every time step [A]
+    time : vector
+        Time at every time step [s]
+    n_samples : int
+        Number of random packs to simulate.
+    zi : tuple, optional
+        Low and high bounds of the uniform initial SOC of each cell [-].
+        Use `None` for the initial SOC of the nominal pack. Default is
+        (0.95, 1.0).
+    q : tuple, optional
+        Low and high bounds of the uniform capacity of each cell [Ah].
+        Default is `None` for the capacity of the nominal pack.
+    r0 : tuple, optional
+        Low and high bounds of a uniform factor applied to `r0` of each cell
+        [-]. Default is `None` for the `r0` of the nominal pack.
+    seed : int, optional
+        Seed for the random streams. Default is `None` for a random seed.
+    n_jobs : int, optional
+        Number of processes. Use -1 for the number of processors. Default is
+        `None` where the samples are simulated in this process.
+    chunk_size : int, optional
+        Number of samples in each chunk. Default value is 16.
+    coupled : bool, optional
+        Use the coupled current split of `PackEcm.simulate()`. Default value
+        is `True`.
+
+    Returns
+    -------
+    summary : dict
+        Mean, standard deviation, min, and max for each metric in `METRICS`
+        and for the pack voltage `v_pack` at every time step. The number of
+        samples is given as `n`.
+    """
+    i_pack = np.asarray(i_pack, dtype=float)
+    time = np.asarray(time, dtype=float)
+
+    sizes = [chunk_size] * (n_samples // chunk_size)
+    if n_samples % chunk_size:
+        sizes.append(n_samples % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(pack, n, s, zi, q, r0, coupled) for n, s in zip(sizes, seeds)]
+
+    if n_jobs is None or n_jobs == 1:
+        results = [_run_samples(p, i_pack, time, n, s, *rest) for p, n, s, *rest in args]
+    else:
+        max_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+        n_steps = len(time)
+        shm = shared_memory.SharedMemory(create=True, size=2 * n_steps * 8)
+        cycle = np.ndarray((2, n_steps), dtype=np.float64, buffer=shm.buf)
+        try:
+            cycle[0] = i_pack
+            cycle[1] = time
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = [pool.submit(_run_shared, shm.name, n_steps, *a) for a in args]
+                results = [future.result() for future in futures]
+        finally:
+            del cycle
+            shm.close()
+            shm.unlink()
+
+    # statistics are merged in chunk order so the result is reproducible
+    metrics = {name: _stats_new() for name in METRICS}
+    trace = _stats_new(len(time))
+    for chunk_metrics, chunk_trace in results:
+        metrics = {name: _stats_merge(metrics[name], chunk_metrics[name]) for name in METRICS}
+        trace = _stats_merge(trace, chunk_trace)
+
+    summary = {name: _stats_summary(stats) for name, stats in metrics.items()}
+    summary['v_pack'] = _stats_summary(trace)
+    summary['n'] = trace[0]
+    return summary
@@ -0,0 +1,196 @@
+import numpy as np
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import splu
+
+
+class PackTopology:
+    """
+    Electrical network of a battery pack given as nodes connected by cells and
+    resistors such as busbars and interconnects. Node voltages are found with
+    nodal analysis where each cell is a voltage source in series with a
+    resistance. The sparse conductance matrix is factored once and the
+    factorization is reused while the cell resistances do not change.
+
+    Parameters
+    ----------
+    n_nodes : int
+        Number of nodes in the network.
+    cells : array
+        Positive and negative node of each cell, shape is (n_cells, 2).
+    resistors : array, optional
+        First node, second node, and resistance [Ω] of each resistor, shape
+        is (n_resistors, 3). Default is `None` for no resistors.
+    positive : int, optional
+        Node of the positive pack terminal where the pack current enters.
+        Default is the last node.
+    negative : int, optional
+        Node of the negative pack terminal which is the reference node at
+        zero volts. Default value is 0.
+
+    Methods
+    -------
+    series_parallel(n_series, n_parallel, r_busbar, r_interconnect)
+        Create topology of modules in series where each module is cells in
+        parallel.
+    solve(g_cells, e_cells, i_pack)
+        Solve node voltages for cell conductances, cell source voltages, and
+        pack current.
+    """
+
+    def __init__(self, n_nodes, cells, resistors=None, positive=None, negative=0):
+        """
+        Initialize with nodes, cells, and resistors of the network.
+        """
+        cells = np.asarray(cells, dtype=int).reshape(-1, 2)
+        resistors = np.zeros((0, 3)) if resistors is None else np.asarray(resistors, dtype=float).reshape(-1, 3)
+
+        self.n_nodes = n_nodes
+        self.cells = cells
+        self.resistors = resistors
+        self.positive = n_nodes - 1 if positive is None else positive
+        self.negative = negative
+
+        # node voltages are solved for every node except the reference node,
+        # which is given index n_keep so its voltage is the appended zero
+        n_keep = n_nodes - 1
+        reduced = np.full(n_nodes, n_keep)
+        reduced[np.delete(np.arange(n_nodes), negative)] = np.arange(n_keep)
+        self._n_keep = n_keep
+        self._pos = reduced[self.positive]
+        self._cell_pos = reduced[cells[:, 0]]
+        self._cell_neg = reduced[cells[:, 1]]
+
+        # stamps of the conductance matrix as (row, col, sign, branch) where
+        # branches are the resistors followed by the cells
+        res_pos = reduced[resistors[:, 0].astype(int)]
+        res_neg = reduced[resistors[:, 1].astype(int)]
+        n_res = len(resistors)
+        branch = np.arange(n_res + len(cells))
+        first = np.concatenate((res_pos, self._cell_pos))
+        second = np.concatenate((res_neg, self._cell_neg))
+        rows = np.concatenate((first, second, first, second))
+        cols = np.concatenate((first, second, second, first))
+        sign = np.concatenate((np.ones(2 * len(branch)), -np.ones(2 * len(branch))))
+        branches = np.tile(branch, 4)
+        mask = (rows < n_keep) & (cols < n_keep)
+
+        # sparsity pattern in CSC order and position of each stamp in it
+        keys, inverse = np.unique(cols[mask] * n_keep + rows[mask], return_inverse=True)
+        self._indices = keys % n_keep
+        self._indptr = np.concatenate(([0], np.cumsum(np.bincount(keys // n_keep, minlength=n_keep))))
+        self._nnz = len(keys)
+
+        is_res = branches[mask] < n_res
+        self._g_res = np.bincount(
+            inverse[is_res], sign[mask][is_res] / resistors[branches[mask][is_res], 2], minlength=self._nnz)
+        self._stamp_pos = inverse[~is_res]
+        self._stamp_sign = sign[mask][~is_res]
+        self._stamp_cell = branches[mask][~is_res] - n_res
+
+        self._g_last = None
+        self._lu = None
+
+    @classmethod
+    def series_parallel(cls, n_series, n_parallel, r_busbar=0.0, r_interconnect=0.0):
+        """
+        Create the topology of a pack where cells are connected in parallel
+        to make a module and the modules are connected in series. Cells are
+        numbered in row-major order of (n_series, n_parallel).
+
+        Parameters
+        ----------
+        n_series : int
+            Number of modules in series.
+        n_parallel : int
+            Number of cells in parallel in each module.
+        r_busbar : float, optional
+            Resistance of the busbar between modules [Ω]. Default value is
+            0.0 where modules are connected directly.
+        r_interconnect : float, optional
+            Resistance between each cell terminal and the module bus [Ω].
+            Default value is 0.0 where cells are connected directly.
+
+        Returns
+        -------
+        topology : PackTopology
+            Network for the series-parallel pack.
+        """
+        n_nodes = 1
+        cells = []
+        resistors = []
+
+        def node():
+            nonlocal n_nodes
+            n_nodes += 1
+            return n_nodes - 1
+
+        bus_neg = 0
+        for s in range(n_series):
+            if s > 0 and r_busbar > 0:
+                prev = bus_neg
+                bus_neg = node()
+                resistors.append((prev, bus_neg, r_busbar))
+            bus_pos = node()
+
+            for _ in range(n_parallel):
+                if r_interconnect > 0:
+                    cp = node()
+                    cm = node()
+                    resistors.append((bus_pos, cp, r_interconnect))
+                    resistors.append((cm, bus_neg, r_interconnect))
+                    cells.append((cp, cm))
+                else:
+                    cells.append((bus_pos, bus_neg))
+
+            bus_neg = bus_pos
+
+        return cls(n_nodes, cells, resistors or None, positive=bus_neg, negative=0)
+
+    @property
+    def n_cells(self):
+        return len(self.cells)
+
+    def solve(self, g_cells, e_cells, i_pack):
+        """
+        Solve the node voltages of the network. Each cell is a source voltage
+        `e` in series with a conductance `g` so the cell current is
+        g * (v_pos - v_neg - e) and the pack current enters the positive
+        terminal.
+
+        Parameters
+        ----------
+        g_cells : vector
+            Conductance of each cell [S]
+        e_cells : vector
+            Source voltage of each cell [V]
+        i_pack : float
+            Current applied to the pack [A]
+
+        Returns
+        -------
+        v_cells : vector
+            Terminal voltage of each cell [V]
+        i_cells : vector
+            Current of each cell [A]
+        v_pack : float
+            Voltage of the positive pack terminal [V]
+        """
+        # factor again only when a cell conductance has changed
+        if self._g_last is None or not np.array_equal(g_cells, self._g_last):
+            data = self._g_res + np.bincount(
+                self._stamp_pos, self._stamp_sign * g_cells[self._stamp_cell], minlength=self._nnz)
+            n = self._n_keep
+            g = csc_matrix((data, self._indices, self._indptr), shape=(n, n))
+            self._lu = splu(g)
+            self._g_last = np.array(g_cells, copy=True)
+
+        # cell sources as currents into the positive node of each cell
+        ge = g_cells * e_cells
+        n = self._n_keep + 1
+        rhs = np.bincount(self._cell_pos, ge, minlength=n) - np.bincount(self._cell_neg, ge, minlength=n)
+        rhs[self._pos] += i_pack
+        v = np.append(self._lu.solve(rhs[:-1]), 0.0)
+
+        v_cells = v[self._cell_pos] - v[self._cell_neg]
+        i_cells = g_cells * (v_cells - e_cells)
+        return v_cells, i_cells, v[self._pos]
@@ -1,5 +1,6 @@
 import numpy as np
-import pandas as pd
+
+from .loaders import read_columns
 
 
 class PackUs06Data:
@@ -15,29 +16,22 @@ class PackUs06Data:
        |            |     |            |     |            |
     """
 
+    __slots__ = ('block', 'time', 'current', 'voltage', 'temp_a1', 'temp_a2', 'temp_a3')
+
     def __init__(self, path, all_data=False):
 
-        df = pd.read_csv(path, skiprows=17)
-
-        if all_data:
-            self.time = df['Total Time'].values
-            self.current = df['Current'].values
-            self.voltage = df['Voltage'].values
-            self.temp_a1 = df['Temperature A1'].values
-            self.temp_a2 = df['Temperature A2'].values
-            self.temp_a3 = df['Temperature A3'].values
-        else:
-            time = df['Total Time'].values
-            current = df['Current'].values
-            voltage = df['Voltage'].values
-            temp_a1 = df['Temperature A1'].values
-            temp_a2 = df['Temperature A2'].values
-            temp_a3 = df['Temperature A3'].values
-
-            idx = np.where(time == 600)[0][0]
-            self.time = time[0:idx + 1]
-            self.current = current[0:idx + 1]
-            self.voltage = voltage[0:idx + 1]
-            self.temp_a1 = temp_a1[0:idx + 1]
-            self.temp_a2 = temp_a2[0:idx + 1]
-            self.temp_a3 = temp_a3[0:idx + 1]
+        columns = ['Total Time', 'Current', 'Voltage', 'Temperature A1', 'Temperature A2', 'Temperature A3']
+        block = read_columns(path, columns, skiprows=17)
+
+        if not all_data:
+            idx = np.where(block['Total Time'] == 600)[0][0]
+            block = block.window(0, idx + 1)
+
+        # every channel is a view of one data block
+        self.block = block
+        self.time = block['Total Time']
+        self.current = block['Current']
+        self.voltage = block['Voltage']
+        self.temp_a1 = block['Temperature A1']
+        self.temp_a2 = block['Temperature A2']
+        self.temp_a3 = block['Temperature A3']
@@ -0,0 +1,233 @@
+import hashlib
+import os
+import tempfile
+from types import ModuleType
+
+import numpy as np
+
+
+class ParamCache:
+    """
+    Persistent cache of fitted equivalent circuit model parameters. Each entry
+    is stored as a compressed `.npz` file in the cache directory. Entries are
+    keyed by the hash of the data file contents, the values in the parameters
+    module, and the curve fit options. The least recently used entries are
+    removed when the cache grows beyond its maximum size.
+
+    Parameters
+    ----------
+    cache_dir : str, optional
+        Directory for the cache files. Default is `~/.cache/ecm`.
+    max_bytes : int, optional
+        Maximum total size of the cache files [bytes]. Default is 100 MB.
+
+    Methods
+    -------
+    key(path, params, **options)
+        Determine cache key for a data file, parameters, and fit options.
+    get(key)
+        Get arrays for a cache key.
+    put(key, **arrays)
+        Store arrays for a cache key.
+    load_rctau(path, data_cls, ecm_cls, params, **options)
+        Get OCV points and RC parameters from the cache or fit them.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=100_000_000):
+        """
+        Initialize with the cache directory and its maximum size.
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'ecm')
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def file_hash(path, chunk_size=1 << 20):
+        """
+        SHA-256 hash of the contents of a file.
+        """
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def _describe(value):
+        """
+        Stable text for a parameter or option value used in the cache key.
+        """
+        if callable(value):
+            return getattr(value, '__qualname__', repr(value))
+        if isinstance(value, np.ndarray):
+            return repr(value.tolist())
+        return repr(value)
+
+    def key(self, path, params, **options):
+        """
+        Determine the cache key for a data file, model parameters, and curve
+        fit options.
+
+        Parameters
+        ----------
+        path : str
+            Path to the data file.
+        params : module
+            Model parameters such as `q_cell`, `eta_chg`, and `eta_dis`.
+        **options
+            Curve fit options and other settings that change the result.
+
+        Returns
+        -------
+        key : str
+            Hexadecimal cache key.
+        """
+        h = hashlib.sha256()
+        h.update(self.file_hash(path).encode())
+
+        for name in sorted(vars(params)):
+            value = getattr(params, name)
+            if name.startswith('_') or isinstance(value, ModuleType):
+                continue
+            h.update(f'{name}={self._describe(value)};'.encode())
+
+        for name in sorted(options):
+            h.update(f'{name}:{self._describe(options[name])};'.encode())
+
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.npz')
+
+    def get(self, key):
+        """
+        Get the arrays stored for a cache key.
+
+        Parameters
+        ----------
+        key : str
+            Cache key from `key()`.
+
+        Returns
+        -------
+        arrays : dict or None
+            Arrays stored for the key or `None` if the key is not in the
+            cache.
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        # a damaged entry can raise many kinds of errors from the zip, zlib,
+        # or npy header parsers, so any error is a cache miss and the entry
+        # is removed
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+        except Exception:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        # update modified time so the entry is recently used, the entry may
+        # already be removed by another process
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return arrays
+
+    def put(self, key, **arrays):
+        """
+        Store arrays for a cache key then remove the least recently used
+        entries if the cache is larger than its maximum size.
+
+        Parameters
+        ----------
+        key : str
+            Cache key from `key()`.
+        **arrays
+            Arrays to store for the key.
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the total size of the
+        cache is within its maximum size.
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.npz'):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        # entries removed by another process at the same time are skipped
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def load_rctau(self, path, data_cls, ecm_cls, params, **options):
+        """
+        Get the open circuit voltage points and RC parameters for an HPPC data
+        file from the cache. If they are not in the cache, the data is loaded,
+        the two time constants function is fit to the data, and the results
+        are stored in the cache.
+
+        Parameters
+        ----------
+        path : str
+            Path to the HPPC data file.
+        data_cls : class
+            Data class such as `CellHppcData` or `ModuleHppcData`.
+        ecm_cls : class
+            Model class such as `CellEcm` or `ModuleEcm`.
+        params : module
+            Model parameters.
+        **options
+            Options for `curve_fit_coeff()` such as `method` or `warm_start`.
+
+        Returns
+        -------
+        v_pts : vector
+            Voltage points for the open circuit voltage [V]
+        z_pts : vector
+            State of charge points for the open circuit voltage [-]
+        rctau : array
+            RC parameters for each 10% SOC section.
+        coeff : array
+            Curve fit coefficients for each 10% SOC section.
+        """
+        # thread or process pools change how the fit runs but not the result
+        key_options = {k: v for k, v in options.items() if k not in ('executor', 'n_jobs')}
+        key = self.key(path, params, data=data_cls.__name__, ecm=ecm_cls.__name__, **key_options)
+
+        arrays = self.get(key)
+        if arrays is None:
+            ecm = ecm_cls(data_cls(path), params)
+            soc = ecm.soc()
+            _, _, _, v_pts, z_pts = ecm.ocv(soc, pts=True)
+            coeff = ecm.curve_fit_coeff(ecm.func_ttc, 5, **options)
+            rctau = ecm.rctau_ttc(coeff)
+            arrays = {'v_pts': v_pts, 'z_pts': z_pts, 'rctau': rctau, 'coeff': coeff}
+            self.put(key, **arrays)
+
+        return arrays['v_pts'], arrays['z_pts'], arrays['rctau'], arrays['coeff']
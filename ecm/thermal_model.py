@@ -2,6 +2,8 @@ import numpy as np
 from scipy.interpolate import interp1d
 from scipy.integrate import solve_ivp
 
+from .kernels import temperature_lumped
+
 
 class ThermalModel:
     """
@@ -179,18 +181,5 @@ class ThermalModel:
         tk : array
             Temperature of the battery cell [K]
         """
-        dt = np.diff(time)
-        nt = len(vt)
-
-        q_gen = np.zeros(nt)
-        tk = np.zeros(nt)
-        tk[0] = ti
-
-        for n in range(nt - 1):
-            q_irrev = i[n] * (vt[n] - ocv[n])
-            q_conv = self.h * self.sa * (self.tf - tk[n])
-            q = q_irrev + q_conv
-            q_gen[n + 1] = q
-            tk[n + 1] = tk[n] + (q / (self.m * self.cp)) * dt[n]
-
+        q_gen, tk = temperature_lumped(i, time, ocv, vt, ti, self.h, self.sa, self.tf, self.m, self.cp)
         return q_gen, tk
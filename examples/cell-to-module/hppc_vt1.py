@@ -18,6 +18,7 @@ import params
 from ecm import CellHppcData
 from ecm import CellEcm
 from ecm import ModuleHppcData
+from ecm import PackEcm
 from ecm import config_ax
 
 # ECM for battery cell
@@ -53,31 +54,16 @@ n_parallel = 2      # number of cells in parallel
 n_series = 2        # number of cells in series
 
 zi = np.ones((n_series, n_parallel))
-ocv_cells = np.interp(zi, z_pts[::-1], v_pts[::-1])
-r0_cells = rctau[:, 2].mean() * np.ones((n_series, n_parallel))
 
 # current applied to battery module
 i_module = data_module.current
 
-i_cells = np.zeros((len(i_module), n_series, n_parallel))
+pack = PackEcm.from_ecm(ecm, n_series, n_parallel, rctau, v_pts, z_pts, zi=zi)
+_, _, _, vt, _ = pack.simulate(i_module, data_module.time)
 
-for k in range(1, len(i_module)):
-    v_modules = (np.sum(ocv_cells / r0_cells, axis=1) - i_module[k]) / np.sum(1 / r0_cells, axis=1)
-    i_cells[k] = ((ocv_cells.T - v_modules).T) / r0_cells
-
-i_cells2 = i_cells.transpose(1, 2, 0).reshape(i_cells[0].size, len(i_module))
-
-n_cells = n_parallel * n_series
-v_cells = np.zeros((n_cells, len(i_module)))
-
-for k in range(n_cells):
-    ecm.current = i_cells2[k]
-    soc = ecm.soc()
-    ocv = ecm.ocv(soc, vz_pts=(v_pts, z_pts))
-    vt = ecm.vt(soc, ocv, rctau)
-    v_cells[k] = vt
-
-v_module = v_cells[0] * n_series
+n_cells = pack.n_cells
+v_cells = vt.reshape(n_cells, -1)
+v_module = pack.v_pack(vt)
 
 # Plot
 # ----------------------------------------------------------------------------
@@ -19,6 +19,7 @@ import numpy as np
 import params
 from ecm import CellHppcData
 from ecm import CellEcm
+from ecm import PackEcm
 from ecm import PackUs06Data
 from ecm import ThermalModel
 from ecm import config_ax
@@ -66,36 +67,21 @@ zi = np.random.uniform(0.95, 1.00, (n_series, n_parallel))
 # pack capacity is the minimum module capacity
 # q_pack = min(np.sum(qi, axis=1))
 
-ocv_cells = np.interp(zi, z_pts[::-1], v_pts[::-1])
-r0_cells = rctau[:, 2].mean() * np.ones((n_series, n_parallel))
-
 # current [A] applied to battery pack at 3C discharge rate
 i_pack = ecm.current * 3
 
-i_cells = np.zeros((len(i_pack), n_series, n_parallel))
-
-for k in range(1, len(i_pack)):
-    v_modules = (np.sum(ocv_cells / r0_cells, axis=1) - i_pack[k]) / np.sum(1 / r0_cells, axis=1)
-    i_cells[k] = ((ocv_cells.T - v_modules).T) / r0_cells
-
-i_cells2 = i_cells.transpose(1, 2, 0).reshape(i_cells[0].size, len(i_pack))
-
-n_cells = n_parallel * n_series
-v_cells = np.zeros((n_cells, len(i_pack)))
-temp_cells = np.zeros((n_cells, len(i_pack)))
-
+# cell currents follow vt = ocv + r0 * i so the balancing currents between
+# cells have the opposite sign of the (ocv - v_module) / r0 split used by
+# earlier versions of this example
 tm = ThermalModel(params)
-
-for k in range(n_cells):
-    ecm.current = i_cells2[k]
-    soc = ecm.soc()
-    ocv = ecm.ocv(soc, vz_pts=(v_pts, z_pts))
-    vt = ecm.vt(soc, ocv, rctau)
-    v_cells[k] = vt
-
-    icell = i_cells2[k]
-    _, temp_cell = tm.calc_q_temp(i=icell, ocv=ocv, time=data_us06.time, ti=297, vt=vt)
-    temp_cells[k] = temp_cell
+pack = PackEcm.from_ecm(ecm, n_series, n_parallel, rctau, v_pts, z_pts, zi=zi, tm=tm, ti=297)
+i_cells, soc, ocv, v_cells, temp_cells = pack.simulate(i_pack, data_us06.time, coupled=True)
+
+# results for each cell as rows of (n_cells, n_steps) arrays
+n_cells = pack.n_cells
+i_cells2 = i_cells.reshape(n_cells, -1)
+v_cells = v_cells.reshape(n_cells, -1)
+temp_cells = temp_cells.reshape(n_cells, -1)
 
 # Plot
 # ----------------------------------------------------------------------------
@@ -59,7 +59,7 @@ soc_1c = ecm.soc()
 ocv_1c = ecm.ocv(soc_1c, vz_pts=(v_pts, z_pts))
 vt_1c = ecm.vt(soc_1c, ocv_1c, rctau)
 
-ti_1c = temp_1c.tc4.iloc[0] + 273.15
+ti_1c = temp_1c.tc4[0] + 273.15
 
 tm_1c = ThermalModel(params)
 q_1c, tk_1c = tm_1c.calc_q_temp(i=dis_1c.current, ocv=ocv_1c, time=dis_1c.time, ti=ti_1c, vt=vt_1c)
@@ -74,7 +74,7 @@ soc_2c = ecm.soc()
 ocv_2c = ecm.ocv(soc_2c, vz_pts=(v_pts, z_pts))
 vt_2c = ecm.vt(soc_2c, ocv_2c, rctau)
 
-ti_2c = temp_2c.tc4.iloc[0] + 273.15
+ti_2c = temp_2c.tc4[0] + 273.15
 
 tm_2c = ThermalModel(params)
 q_2c, tk_2c = tm_2c.calc_q_temp(i=dis_2c.current, ocv=ocv_2c, time=dis_2c.time, ti=ti_2c, vt=vt_2c)
@@ -89,7 +89,7 @@ soc_3c = ecm.soc()
 ocv_3c = ecm.ocv(soc_3c, vz_pts=(v_pts, z_pts))
 vt_3c = ecm.vt(soc_3c, ocv_3c, rctau)
 
-ti_3c = temp_3c.tc4.iloc[0] + 273.15
+ti_3c = temp_3c.tc4[0] + 273.15
 
 tm_3c = ThermalModel(params)
 q_3c, tk_3c = tm_3c.calc_q_temp(i=dis_3c.current, ocv=ocv_3c, time=dis_3c.time, ti=ti_3c, vt=vt_3c)
@@ -0,0 +1,72 @@
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+from ecm import CellEcm, CellHppcData
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(ROOT, 'examples', 'data', 'cell-low-current-hppc-25c-2.csv')
+
+
+def _params():
+    spec = importlib.util.spec_from_file_location('params', os.path.join(ROOT, 'examples', 'cell', 'params.py'))
+    params = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(params)
+    return params
+
+
+@pytest.fixture(scope='module')
+def ecm():
+    return CellEcm(CellHppcData(DATA), _params())
+
+
+def _sse(ecm, func, coeff):
+    """
+    Sum of squared errors of the fit over all SOC sections.
+    """
+    _, _, id2, _, id4 = ecm.idd
+    sse = 0.0
+    for popt, start, end in zip(coeff, id2, id4):
+        t = ecm.time[start:end] - ecm.time[start]
+        sse += np.sum((func(t, *popt) - ecm.voltage[start:end])**2)
+    return sse
+
+
+@pytest.mark.parametrize('ncoeff', [3, 5])
+def test_n_jobs_matches_serial(ecm, ncoeff):
+    func = ecm.func_otc if ncoeff == 3 else ecm.func_ttc
+    serial = ecm.curve_fit_coeff(func, ncoeff)
+    parallel = ecm.curve_fit_coeff(func, ncoeff, n_jobs=2)
+    assert np.array_equal(serial, parallel)
+
+
+@pytest.mark.parametrize('ncoeff', [3, 5])
+def test_jac_same_sse_fewer_evaluations(ecm, ncoeff):
+    func, jac = (ecm.func_otc, ecm.jac_otc) if ncoeff == 3 else (ecm.func_ttc, ecm.jac_ttc)
+    coeff, nfev = ecm.curve_fit_coeff(func, ncoeff, nfev=True)
+    coeff_jac, nfev_jac = ecm.curve_fit_coeff(func, ncoeff, jac=jac, nfev=True)
+    assert _sse(ecm, func, coeff_jac) == pytest.approx(_sse(ecm, func, coeff), rel=1e-6)
+    assert nfev_jac.sum() < nfev.sum()
+
+
+@pytest.mark.parametrize('ncoeff', [3, 5])
+def test_warm_start_same_coefficients(ecm, ncoeff):
+    func = ecm.func_otc if ncoeff == 3 else ecm.func_ttc
+    coeff = ecm.curve_fit_coeff(func, ncoeff)
+    coeff_warm = ecm.curve_fit_coeff(func, ncoeff, warm_start=True)
+    assert np.allclose(coeff_warm, coeff, rtol=1e-3, atol=1e-6)
+
+
+@pytest.mark.parametrize('ncoeff', [3, 5])
+def test_varpro_same_sse(ecm, ncoeff):
+    func = ecm.func_otc if ncoeff == 3 else ecm.func_ttc
+    coeff = ecm.curve_fit_coeff(func, ncoeff)
+    coeff_varpro = ecm.curve_fit_coeff(func, ncoeff, method='varpro')
+    assert _sse(ecm, func, coeff_varpro) == pytest.approx(_sse(ecm, func, coeff), rel=1e-6)
+
+
+def test_unknown_method_raises(ecm):
+    with pytest.raises(ValueError):
+        ecm.curve_fit_coeff(ecm.func_ttc, 5, method='varpr')
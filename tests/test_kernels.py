@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import ecm.kernels as kernels
+
+RCTAU = np.tile([10.0, 100.0, 0.01, 0.005, 0.005, 0.0, 0.0], (9, 1))
+
+
+@pytest.fixture(params=[True, False], ids=['numba', 'numpy'])
+def backend(request, monkeypatch):
+    if request.param and not kernels.HAS_NUMBA:
+        pytest.skip('Numba is not installed')
+    monkeypatch.setattr(kernels, 'USE_NUMBA', request.param)
+
+
+@pytest.mark.parametrize('shape', [(0,), (3, 0)])
+def test_soc_coulomb_empty(backend, shape):
+    z = kernels.soc_coulomb(np.empty(shape), np.empty(0), 3.0, 1.0, 1.0)
+    assert z.shape == shape
+
+
+def test_soc_coulomb_matches_loop(backend):
+    rng = np.random.default_rng(0)
+    current = rng.uniform(-5, 5, 200)
+    time = np.cumsum(rng.uniform(0.5, 1.5, 200))
+
+    z = np.ones(len(current))
+    for k in range(1, len(current)):
+        eta = 0.99 if current[k] > 0 else 1.0
+        z[k] = z[k - 1] + eta * current[k] * (time[k] - time[k - 1]) / (3.0 * 3600)
+
+    assert np.allclose(kernels.soc_coulomb(current, time, 3.0, 0.99, 1.0), z, rtol=0, atol=1e-12)
+
+
+def test_linear_recurrence_empty(backend):
+    assert kernels.linear_recurrence(np.empty(0), np.empty(0)).shape == (0,)
+
+
+def test_vt_cells_empty(backend):
+    empty = np.empty((2, 0))
+    assert kernels.vt_cells(empty, np.empty(0), empty, empty, RCTAU).shape == (2, 0)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from ecm import iter_sections
+from ecm.loaders import read_columns
+
+COLUMNS = ['Time(s)', 'Current(A)', 'Voltage(V)']
+
+
+def _write_log(path, footer=False):
+    rng = np.random.default_rng(0)
+    n = 500
+    flags = np.full(n, ' ', dtype=object)
+    flags[[0, 1, 37, 38, 120, 121, 122, 300, 499]] = 'S'
+    flags[[60, 250]] = 'D'
+    flags[-1] = 'Q'
+
+    with open(path, 'w') as f:
+        f.write(','.join(COLUMNS + ['Data']) + '\n')
+        for k in range(n):
+            f.write(f'{k * 0.1:.1f},{rng.uniform(-5, 5):.4f},{rng.uniform(3, 4.2):.4f},{flags[k]}\n')
+        if footer:
+            f.write('Total Number of Data Lines in the Database: 0000000500')
+    return str(path)
+
+
+@pytest.mark.parametrize('footer', [False, True])
+@pytest.mark.parametrize('chunksize', [1, 7, 37, 38, 100, 499, 500, 10_000])
+def test_sections_across_chunk_edges(tmp_path, chunksize, footer):
+    path = _write_log(tmp_path / 'log.csv', footer)
+    block = read_columns(path, COLUMNS, flag='Data')
+    flags = block['Data']
+
+    sections = list(iter_sections(path, COLUMNS, 'Data', chunksize=chunksize))
+    starts = [start for start, _ in sections]
+    edges = np.flatnonzero(np.isin(flags, ('S', 'Q')))
+    assert starts == sorted(set([0]) | set(edges.tolist()))
+
+    for name in COLUMNS:
+        joined = np.concatenate([section[name] for _, section in sections])
+        assert np.array_equal(joined, block[name])
+    assert np.array_equal(np.concatenate([section['Data'] for _, section in sections]), flags)
+
+    for start, section in sections:
+        stop = start + len(section['Time(s)'])
+        assert np.array_equal(section['Time(s)'], block['Time(s)'][start:stop])
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+
+from ecm import ParamCache
+
+
+def _entry(tmp_path):
+    cache = ParamCache(str(tmp_path))
+    cache.put('key', v_pts=np.linspace(4.2, 3.0, 50), rctau=np.ones((9, 7)))
+    return cache, os.path.join(str(tmp_path), 'key.npz')
+
+
+def test_get_hit(tmp_path):
+    cache, _ = _entry(tmp_path)
+    arrays = cache.get('key')
+    assert np.array_equal(arrays['rctau'], np.ones((9, 7)))
+
+
+def test_get_missing_is_miss(tmp_path):
+    cache = ParamCache(str(tmp_path))
+    assert cache.get('missing') is None
+
+
+def test_truncated_entry_is_miss(tmp_path):
+    cache, path = _entry(tmp_path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:len(data) // 2])
+
+    assert cache.get('key') is None
+    assert not os.path.exists(path)
+
+
+def test_zeroed_entry_is_miss(tmp_path):
+    cache, path = _entry(tmp_path)
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    data[200:400] = bytes(len(data[200:400]))
+    with open(path, 'wb') as f:
+        f.write(bytes(data))
+
+    assert cache.get('key') is None
+    assert not os.path.exists(path)